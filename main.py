@@ -1,15 +1,17 @@
 import logging
 from qpopcv import QPopApp
+from qpopcv.async_log import setup_logging
 
 
 def main() -> None:
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    )
+    # Console output is written by a background thread, never the watcher's.
+    listener = setup_logging(logging.INFO)
 
-    app = QPopApp()
-    app.run()
+    try:
+        app = QPopApp()
+        app.run()
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
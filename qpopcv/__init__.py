@@ -9,6 +9,7 @@ This package contains:
 """
 
 from .app_ui import QPopApp
+from .async_log import setup_logging
 from .config import APP_VERSION
 
 __all__ = ["QPopApp", "APP_VERSION"]
@@ -19,5 +20,9 @@ __package_name__ = "QPopCV"
 
 def main() -> None:
     #Entry point for the `qpopcv` console script.
-    app = QPopApp()
-    app.run()
\ No newline at end of file
+    listener = setup_logging()
+    try:
+        app = QPopApp()
+        app.run()
+    finally:
+        listener.stop()
\ No newline at end of file
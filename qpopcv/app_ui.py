@@ -1,6 +1,5 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 import threading
-import time
 import webbrowser
 from pathlib import Path
 import logging
@@ -13,10 +12,12 @@ from .config import (
     APP_DIR,
     APP_VERSION,
     DISCORD_SERVER_URL,
+    OUTBOX_PATH,
     load_config,
     save_config,
 )
-from .watcher import QPopWatcher, THROTTLE_SECONDS, WatcherSettings
+from .notifier import Notifier, parse_destinations
+from .watcher import QPopWatcher, WatcherSettings
 from .updater import UpdateInfo, UpdateManager
 from .theme import (
     BG_COLOR,
@@ -31,15 +32,23 @@ from .theme import (
     DETECTED,
 )
 from .validators import validate_discord_core, validate_reference_image
-from .discord_client import send_test_message
 
 logger = logging.getLogger(__name__)
 
+# How long closing the window waits on notifications still being sent.
+CLOSE_WAIT_SECONDS = 0.5
+
 class QPopApp:
     def __init__(self) -> None:
         self.config: Dict[str, object] = load_config()
-        self._last_test_time: float = 0.0
         self._watcher: Optional[QPopWatcher] = None
+
+        # One notifier for the app: Test Connection and every watcher share
+        # its connections, payloads and throttles. Starting it right away
+        # also delivers anything left in the outbox by a previous run.
+        self.notifier = Notifier(OUTBOX_PATH)
+        self._configure_notifier()
+        self.notifier.start()
         self._update_info: Optional[UpdateInfo] = None
         self._update_clickable: bool = False
 
@@ -308,26 +317,25 @@ class QPopApp:
         messagebox.showinfo("Saved", "Configuration saved.")
 
     def on_test_discord(self) -> None:
-        throttled, remaining, now = self._check_test_throttle()
-        if throttled:
-            messagebox.showwarning(
-                "Throttled",
-                f"Please wait {remaining} seconds before sending another test.",
-            )
-            return
-
         webhook_url = self.webhook_var.get().strip()
         user_id = self.user_var.get().strip()
 
         if not validate_discord_core(webhook_url, user_id):
             return
 
-        try:
-            send_test_message(webhook_url, user_id, timeout=5.0)
-            self._last_test_time = now
-            messagebox.showinfo("Success", "Test message sent.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to send test:\n{e}")
+        # Sent in the background; the result comes back via root.after.
+        # Uses the fields as typed, without touching the saved config or the
+        # notifier a running watcher is sending pops through.
+        queued, remaining = self.notifier.send_test(
+            lambda error: self.root.after(0, lambda: self._on_test_result(error)),
+            webhook_url=webhook_url,
+            user_id=user_id,
+        )
+        if not queued:
+            messagebox.showwarning(
+                "Throttled",
+                f"Please wait {remaining} seconds before sending another test.",
+            )
 
     def on_open_discord(self) -> None:
         webbrowser.open(DISCORD_SERVER_URL)
@@ -365,8 +373,12 @@ class QPopApp:
         self._watcher = QPopWatcher(
             settings,
             on_detect=self._flash_detected_status,
+            on_calibrated=self._on_watcher_calibrated,
+            notifier=self.notifier,
         )
         self._watcher.start()
+        # Keep the webhook connections warm only while watching.
+        self.notifier.set_keep_warm(True)
 
         self._set_status("● Watching", SUCCESS)
         self.watch_btn.configure(
@@ -378,18 +390,43 @@ class QPopApp:
     def _stop_watch(self) -> None:
         if self._watcher:
             self._watcher.stop()
+        self.notifier.set_keep_warm(False)
 
         self._set_status("● Stopped", DANGER)
         self.watch_btn.configure(
             text="Watch", fg_color=ACCENT, hover_color=ACCENT_HOVER
         )
 
-    def _check_test_throttle(self):
-        now = time.time()
-        elapsed = now - self._last_test_time
-        if elapsed < THROTTLE_SECONDS:
-            return True, int(THROTTLE_SECONDS - elapsed), now
-        return False, 0, now
+    def _on_watcher_calibrated(self, scale: float, screen: Tuple[int, int]) -> None:
+        # Called from the watcher thread; persist on the Tk thread. Only the
+        # calibration goes to disk, not unsaved edits in the UI; the watcher
+        # runs on the saved reference.
+        def apply() -> None:
+            saved = load_config()
+            reference = saved.get("reference_image_path", "")
+            calibration = {
+                "calibrated_scale": scale,
+                "calibrated_screen": list(screen),
+                "calibrated_reference": str(Path(str(reference)).expanduser()),
+            }
+            self.config.update(calibration)
+            saved.update(calibration)
+            save_config(saved)
+
+        self.root.after(0, apply)
+
+    def _configure_notifier(self) -> None:
+        self.notifier.configure(
+            str(self.config.get("webhook_url", "")),
+            str(self.config.get("user_id", "")),
+            parse_destinations(self.config.get("notify_destinations")),
+        )
+
+    def _on_test_result(self, error: Optional[Exception]) -> None:
+        if error is None:
+            messagebox.showinfo("Success", "Test message sent.")
+        else:
+            messagebox.showerror("Error", f"Failed to send test:\n{error}")
 
     # --------- Updater logic ---------
 
@@ -501,6 +538,9 @@ class QPopApp:
     def on_close(self) -> None:
         if self._watcher:
             self._watcher.stop()
+        # Runs on the Tk thread: don't hang the window on a slow webhook.
+        # Unsent entries stay in the outbox and go out on the next start.
+        self.notifier.close(timeout=CLOSE_WAIT_SECONDS)
         self.root.destroy()
 
     def run(self) -> None:
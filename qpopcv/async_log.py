@@ -0,0 +1,87 @@
+# Asynchronous logging helpers.
+# Log calls only put the record on a queue; a background listener thread does
+# the formatting and the console/file I/O, so a slow or redirected stdout can
+# never stall the detection loop.
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Hashable, Optional, Tuple
+import logging
+import queue
+import threading
+import time
+
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+
+def setup_logging(level: int = logging.INFO) -> QueueListener:
+    # App entry points: console logging at `level`, written by a background
+    # thread. Call `stop()` on the returned listener at exit.
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+    return start_async_logging()
+
+
+def start_async_logging(root: Optional[logging.Logger] = None) -> QueueListener:
+    """
+    Move the handlers currently on `root` (default: the root logger, e.g. as
+    set up by `logging.basicConfig`) behind a QueueHandler. Returns the
+    started listener; call `stop()` on it at exit to flush what is queued.
+    """
+    root = root or logging.getLogger()
+    handlers = list(root.handlers)
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def async_handler(handler: logging.Handler) -> Tuple[QueueHandler, QueueListener]:
+    # Wrap one handler (e.g. a file sink) so writes happen on its own thread.
+    # Attach the returned QueueHandler; stop the listener before closing
+    # `handler`.
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    return QueueHandler(log_queue), listener
+
+
+class RateLimitedLog:
+    """
+    Logs a repeating message at most once per `interval` seconds per key.
+    - The first occurrence of a key is logged right away.
+    - Repeats inside the interval are only counted; the next one that gets
+      through reports how many were suppressed.
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = 60.0) -> None:
+        self._logger = logger
+        self._interval = interval
+        self._lock = threading.Lock()
+        # key -> (time.monotonic() of last emit, suppressed since then)
+        self._state: Dict[Hashable, Tuple[float, int]] = {}
+
+    def log(
+        self,
+        level: int,
+        key: Hashable,
+        msg: str,
+        *args: object,
+        exc_info: object = None,
+    ) -> bool:
+        # Returns True if the message was logged.
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._state.get(key, (float("-inf"), 0))
+            if now - last < self._interval:
+                self._state[key] = (last, suppressed + 1)
+                return False
+            self._state[key] = (now, 0)
+
+        if suppressed:
+            msg = f"{msg} ({suppressed} similar suppressed)"
+        self._logger.log(level, msg, *args, exc_info=exc_info)
+        return True
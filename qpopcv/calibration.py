@@ -0,0 +1,124 @@
+# One-time UI scale calibration for the user reference image.
+# Sweeps a wide range of scales against a frame that shows the popup and
+# returns the single best one, so the watcher can match one template forever.
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .matcher import MATCH_METHOD
+
+# Coarse sweep (0.5x .. 2.0x), then a fine pass around the coarse winner.
+COARSE_SCALES: Tuple[float, ...] = tuple(
+    round(0.5 + 0.05 * i, 2) for i in range(31)
+)
+FINE_STEP = 0.01
+FINE_SPAN = 0.05
+
+# Whole-frame search: the coarse sweep runs on copies downscaled by this
+# factor, then only scales within SEARCH_SPAN of the winner are re-run at
+# full resolution around where it was found.
+SEARCH_DOWNSCALE = 0.25
+SEARCH_SPAN = 0.1
+
+
+@dataclass
+class CalibrationResult:
+    scale: float
+    score: float
+    location: Tuple[int, int]  # top-left (x, y) inside the searched frame
+
+
+def _score_at_scale(
+    reference: np.ndarray,
+    frame: np.ndarray,
+    scale: float,
+) -> Optional[CalibrationResult]:
+    width = int(round(reference.shape[1] * scale))
+    height = int(round(reference.shape[0] * scale))
+    if width < 1 or height < 1 or width > frame.shape[1] or height > frame.shape[0]:
+        return None
+
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+    template = cv2.resize(reference, (width, height), interpolation=interpolation)
+    scores = cv2.matchTemplate(frame, template, MATCH_METHOD)
+    _, max_val, _, max_loc = cv2.minMaxLoc(scores)
+
+    return CalibrationResult(
+        scale=scale,
+        score=float(max_val),
+        location=(int(max_loc[0]), int(max_loc[1])),
+    )
+
+
+def calibrate_scale(
+    reference: np.ndarray,
+    frame: np.ndarray,
+    scales: Sequence[float] = COARSE_SCALES,
+) -> Optional[CalibrationResult]:
+    """
+    Find the reference scale that best matches `frame`.
+
+    Both arrays are uint8 grayscale. Returns None when no scale fits inside
+    the frame; callers decide whether the best score is good enough.
+    """
+    best: Optional[CalibrationResult] = None
+
+    for scale in scales:
+        result = _score_at_scale(reference, frame, scale)
+        if result is not None and (best is None or result.score > best.score):
+            best = result
+
+    if best is None:
+        return None
+
+    center = best.scale
+    steps = int(round(FINE_SPAN / FINE_STEP))
+    for i in range(-steps, steps + 1):
+        scale = round(center + i * FINE_STEP, 3)
+        if scale <= 0 or i == 0:
+            continue
+        result = _score_at_scale(reference, frame, scale)
+        if result is not None and result.score > best.score:
+            best = result
+
+    return best
+
+
+def search_scale(
+    reference: np.ndarray,
+    frame: np.ndarray,
+    downscale: float = SEARCH_DOWNSCALE,
+) -> Optional[CalibrationResult]:
+    """
+    Find the reference anywhere in `frame`, at any COARSE_SCALES scale.
+
+    Unlike `calibrate_scale` this needs no prior detection: the sweep runs
+    on downscaled copies and only the winner is refined at full resolution.
+    `location` is relative to `frame`.
+    """
+    small_frame = cv2.resize(
+        frame, None, fx=downscale, fy=downscale, interpolation=cv2.INTER_AREA
+    )
+    small_reference = cv2.resize(
+        reference, None, fx=downscale, fy=downscale, interpolation=cv2.INTER_AREA
+    )
+    coarse = calibrate_scale(small_reference, small_frame)
+    if coarse is None:
+        return None
+
+    # Full-resolution window with room for the largest nearby scale.
+    pad = int(np.ceil(2.0 / downscale))
+    reach = coarse.scale + SEARCH_SPAN
+    x0 = max(0, int(coarse.location[0] / downscale) - pad)
+    y0 = max(0, int(coarse.location[1] / downscale) - pad)
+    x1 = min(frame.shape[1], x0 + int(reference.shape[1] * reach) + 2 * pad)
+    y1 = min(frame.shape[0], y0 + int(reference.shape[0] * reach) + 2 * pad)
+
+    scales = [s for s in COARSE_SCALES if abs(s - coarse.scale) <= SEARCH_SPAN + 1e-6]
+    best = calibrate_scale(reference, frame[y0:y1, x0:x1], scales or [coarse.scale])
+    if best is None:
+        return None
+    best.location = (x0 + best.location[0], y0 + best.location[1])
+    return best
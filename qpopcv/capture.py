@@ -0,0 +1,294 @@
+# Screen capture backends for the queue watcher.
+# Every backend reduces the watch region to the matcher's working format
+# (RGB, gray or one channel, optionally downscaled), writes it into a small
+# preallocated ring of numpy buffers and times its own grabs so capture cost
+# can be reported next to matching cost.
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import logging
+import threading
+import time
+
+import cv2
+import numpy as np
+import pyautogui
+
+try:
+    import mss
+except ImportError:  # optional fast backend
+    mss = None
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_BACKENDS = ("auto", "mss", "pyautogui")
+FRAME_COLORS = ("rgb", "gray", "green")
+DEFAULT_RING_SIZE = 3
+
+Region = Tuple[int, int, int, int]  # (left, top, width, height)
+
+
+@dataclass(frozen=True)
+class FrameFormat:
+    color: str = "gray"  # "rgb", "gray" or "green" (single channel)
+    scale: float = 1.0  # downscale factor applied at capture time
+
+    def frame_shape(self, width: int, height: int) -> Tuple[int, ...]:
+        scaled_w = max(1, int(round(width * self.scale)))
+        scaled_h = max(1, int(round(height * self.scale)))
+        if self.color == "rgb":
+            return scaled_h, scaled_w, 3
+        return scaled_h, scaled_w
+
+
+def reduce_pixels(
+    pixels: np.ndarray,
+    fmt: FrameFormat,
+    bgra: bool = False,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Convert RGB (or BGRA, with `bgra=True`) pixels to `fmt`, writing into
+    `out` when given. Used for both captured frames and reference images so
+    the two always go through the same reduction.
+    """
+    shape = fmt.frame_shape(pixels.shape[1], pixels.shape[0])
+    if out is None or out.shape != shape:
+        out = np.empty(shape, dtype=np.uint8)
+    resize = shape[:2] != pixels.shape[:2]
+    # Without a resize, color conversions write straight into `out`.
+    target = None if resize else out
+
+    if fmt.color == "gray":
+        code = cv2.COLOR_BGRA2GRAY if bgra else cv2.COLOR_RGB2GRAY
+        reduced = cv2.cvtColor(pixels, code, dst=target)
+    elif fmt.color == "green":
+        reduced = pixels[:, :, 1]
+    elif bgra:
+        reduced = cv2.cvtColor(pixels, cv2.COLOR_BGRA2RGB, dst=target)
+    else:
+        reduced = pixels[:, :, :3]
+
+    if resize:
+        cv2.resize(reduced, (shape[1], shape[0]), dst=out, interpolation=cv2.INTER_AREA)
+    elif reduced is not out:
+        np.copyto(out, reduced)
+    return out
+
+
+@dataclass
+class CaptureStats:
+    frames: int = 0
+    total_seconds: float = 0.0
+    last_seconds: float = 0.0
+
+    @property
+    def average_seconds(self) -> float:
+        return self.total_seconds / self.frames if self.frames else 0.0
+
+
+class FrameSource(ABC):
+    """
+    Base class for capture backends.
+    - `grab()` returns the current region as a uint8 array in `fmt` (H x W
+      for gray/green, H x W x 3 for rgb). The array is one of `ring_size`
+      reused buffers and stays valid until `ring_size - 1` further grabs;
+      copy it to keep it longer.
+    - The ring is allocated on the first `grab()` without `out`, so callers
+      that always pass their own buffers (pipeline mode) never pay for it.
+    - `set_region()` retargets the source (e.g. after a resolution change)
+      and drops the ring.
+    - `close()` releases backend resources; call it from the capturing thread.
+    """
+
+    name = "base"
+
+    def __init__(
+        self,
+        region: Region,
+        ring_size: int = DEFAULT_RING_SIZE,
+        fmt: FrameFormat = FrameFormat(),
+    ) -> None:
+        self._region = region
+        self._format = fmt
+        self._ring_size = max(1, int(ring_size))
+        self._ring: List[np.ndarray] = []
+        self._ring_index = 0
+        self.stats = CaptureStats()
+
+    @property
+    def region(self) -> Region:
+        return self._region
+
+    @property
+    def format(self) -> FrameFormat:
+        return self._format
+
+    @property
+    def frame_shape(self) -> Tuple[int, ...]:
+        _, _, width, height = self._region
+        return self._format.frame_shape(width, height)
+
+    def set_region(self, region: Region) -> None:
+        self._region = region
+        self._ring = []
+
+    def grab(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        # Capture into `out` if given (caller-managed buffer), else the ring.
+        started = time.perf_counter()
+        frame = self._grab(out if out is not None else self._next_buffer())
+        elapsed = time.perf_counter() - started
+
+        self.stats.frames += 1
+        self.stats.total_seconds += elapsed
+        self.stats.last_seconds = elapsed
+        return frame
+
+    def close(self) -> None:
+        pass
+
+    def _allocate_ring(self) -> None:
+        _, _, width, height = self._region
+        shape = self._format.frame_shape(width, height)
+        self._ring = [np.empty(shape, dtype=np.uint8) for _ in range(self._ring_size)]
+        self._ring_index = 0
+
+    def _next_buffer(self) -> np.ndarray:
+        if not self._ring:
+            self._allocate_ring()
+        buf = self._ring[self._ring_index]
+        self._ring_index = (self._ring_index + 1) % self._ring_size
+        return buf
+
+    @abstractmethod
+    def _grab(self, out: np.ndarray) -> np.ndarray:
+        # Capture into `out` (already in the working format) and return it.
+        ...
+
+
+class PyAutoGUISource(FrameSource):
+    # Fallback backend: one PIL screenshot per grab, copied into the ring.
+    name = "pyautogui"
+
+    def _grab(self, out: np.ndarray) -> np.ndarray:
+        screenshot = pyautogui.screenshot(region=self._region)
+        pixels = np.asarray(screenshot.convert("RGB"))
+        return reduce_pixels(pixels, self._format, out=out)
+
+
+class MSSSource(FrameSource):
+    # Fast backend: mss grabs straight from the OS (GDI BitBlt / X11 SHM).
+    name = "mss"
+
+    def __init__(
+        self,
+        region: Region,
+        ring_size: int = DEFAULT_RING_SIZE,
+        fmt: FrameFormat = FrameFormat(),
+    ) -> None:
+        super().__init__(region, ring_size, fmt)
+        # mss handles are thread-bound, so open lazily in the grabbing thread.
+        self._sct = None
+
+    def _grab(self, out: np.ndarray) -> np.ndarray:
+        if self._sct is None:
+            self._sct = mss.mss()
+
+        left, top, width, height = self._region
+        shot = self._sct.grab(
+            {"left": left, "top": top, "width": width, "height": height}
+        )
+        # np.asarray wraps mss's BGRA bytes without copying; the reduction
+        # writes straight into the ring buffer.
+        return reduce_pixels(np.asarray(shot), self._format, bgra=True, out=out)
+
+    def close(self) -> None:
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+
+@dataclass
+class CapturedFrame:
+    pixels: np.ndarray
+    captured_at: float  # time.monotonic() right after the grab
+    seq: int
+
+
+class FrameMailbox:
+    """
+    Single-slot, latest-frame-wins handoff from a capture thread to a
+    matching thread.
+    - `publish()` replaces any frame the consumer hasn't taken yet (counted
+      in `dropped`).
+    - Buffers are triple-buffered: one being written, one waiting, one held
+      by the consumer. The producer never gets a buffer the consumer holds.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._latest: Optional[CapturedFrame] = None
+        self._held: Optional[np.ndarray] = None
+        self._free: List[np.ndarray] = []
+        self._closed = False
+        self._seq = 0
+        self.published = 0
+        self.dropped = 0
+
+    def acquire(self, shape: Tuple[int, ...]) -> np.ndarray:
+        # A buffer the producer may write into.
+        with self._cond:
+            while self._free:
+                buf = self._free.pop()
+                if buf.shape == shape:
+                    return buf
+        return np.empty(shape, dtype=np.uint8)
+
+    def publish(self, pixels: np.ndarray, captured_at: float) -> None:
+        with self._cond:
+            if self._latest is not None:
+                self.dropped += 1
+                self._free.append(self._latest.pixels)
+            self._seq += 1
+            self.published += 1
+            self._latest = CapturedFrame(pixels, captured_at, self._seq)
+            self._cond.notify()
+
+    def take(self, timeout: float) -> Optional[CapturedFrame]:
+        # Newest frame, or None on timeout/close. The previous frame's buffer
+        # goes back to the producer.
+        with self._cond:
+            if self._latest is None and not self._closed:
+                self._cond.wait(timeout)
+            frame, self._latest = self._latest, None
+            if frame is None:
+                return None
+            if self._held is not None:
+                self._free.append(self._held)
+            self._held = frame.pixels
+            return frame
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+def create_frame_source(
+    backend: str,
+    region: Region,
+    ring_size: int = DEFAULT_RING_SIZE,
+    fmt: FrameFormat = FrameFormat(),
+) -> FrameSource:
+    backend = backend.strip().lower()
+    if backend not in CAPTURE_BACKENDS:
+        logger.warning("Unknown capture_backend %r; using 'auto'.", backend)
+        backend = "auto"
+
+    if backend in ("auto", "mss"):
+        if mss is not None:
+            return MSSSource(region, ring_size, fmt)
+        if backend == "mss":
+            logger.warning("mss is not installed; falling back to pyautogui capture.")
+
+    return PyAutoGUISource(region, ring_size, fmt)
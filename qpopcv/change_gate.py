@@ -0,0 +1,83 @@
+# Cheap frame-change detector that sits in front of template matching.
+# Compares a small grayscale thumbnail of each frame with the thumbnail of the
+# last frame that was actually matched.
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+import numpy as np
+
+THUMBNAIL_WIDTH = 64
+
+
+@dataclass
+class GateStats:
+    frames: int = 0
+    skipped: int = 0
+
+    @property
+    def evaluated(self) -> int:
+        return self.frames - self.skipped
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.frames if self.frames else 0.0
+
+
+class FrameChangeGate:
+    """
+    Decides whether a frame differs enough from the last evaluated frame to be
+    worth matching again.
+    - Frames are reduced to a THUMBNAIL_WIDTH-wide grayscale thumbnail
+      (area-averaged, so sensor noise and tiny animations wash out).
+    - A frame counts as changed when any thumbnail cell moved by more than
+      `threshold` gray levels since the last evaluated frame.
+    - The reference thumbnail only advances on evaluated frames, so a slow
+      fade-in still adds up and eventually trips the gate.
+    """
+
+    def __init__(self, threshold: float = 8.0) -> None:
+        self._threshold = float(threshold)
+        self._reference: Optional[np.ndarray] = None
+        # Two thumbnail buffers, swapped when a frame becomes the reference.
+        self._thumb: Optional[np.ndarray] = None
+        self._diff: Optional[np.ndarray] = None
+        self.stats = GateStats()
+
+    def should_evaluate(self, gray: np.ndarray, force: bool = False) -> bool:
+        # `gray` is the uint8 grayscale frame the matcher will use. `force`
+        # evaluates it regardless (and makes it the new reference).
+        self.stats.frames += 1
+        thumb = self._thumbnail(gray)
+
+        if (
+            not force
+            and self._reference is not None
+            and self._reference.shape == thumb.shape
+        ):
+            if self._diff is None or self._diff.shape != thumb.shape:
+                self._diff = np.empty_like(thumb)
+            cv2.absdiff(thumb, self._reference, dst=self._diff)
+            if float(self._diff.max()) <= self._threshold:
+                self.stats.skipped += 1
+                return False
+
+        # Swap buffers: the new thumbnail becomes the reference.
+        self._thumb, self._reference = self._reference, thumb
+        return True
+
+    def reset(self) -> None:
+        # Force the next frame to be evaluated.
+        self._reference = None
+
+    def _thumbnail(self, gray: np.ndarray) -> np.ndarray:
+        height, width = gray.shape[:2]
+        thumb_w = min(THUMBNAIL_WIDTH, width)
+        thumb_h = max(1, int(round(height * thumb_w / width)))
+
+        if self._thumb is None or self._thumb.shape != (thumb_h, thumb_w):
+            self._thumb = np.empty((thumb_h, thumb_w), dtype=np.uint8)
+        cv2.resize(
+            gray, (thumb_w, thumb_h), dst=self._thumb, interpolation=cv2.INTER_AREA
+        )
+        return self._thumb
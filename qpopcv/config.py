@@ -10,6 +10,8 @@ else:
 
 APP_VERSION = "1.0.4"
 CONFIG_PATH = APP_DIR / "config.json"
+OUTBOX_PATH = APP_DIR / "outbox.json"  # undelivered notifications
+SUBTEMPLATE_CACHE_PATH = APP_DIR / "subtemplates.json"  # chosen sub-templates
 DISCORD_SERVER_URL = "https://discord.gg/vXvjcrUFm8"  # QPopCV Discord Server (PermaLink)
 
 DEFAULT_CONFIG: Dict[str, object] = {
@@ -18,6 +20,40 @@ DEFAULT_CONFIG: Dict[str, object] = {
     "check_interval": 0.15,
     "confidence": 0.6,
     "reference_image_path": "",
+    "pipeline": True,
+    "capture_backend": "auto",
+    "capture_ring_size": 3,
+    "frame_color": "gray",
+    "frame_scale": 1.0,
+    "match_mode": "direct",
+    "match_workers": 1,
+    "pyramid_scale": 0.25,
+    "pyramid_candidates": 3,
+    "tile_size": 64,
+    "tile_threshold": 8.0,
+    "lock_roi": True,
+    "lock_padding": 16,
+    "lock_max_misses": 5,
+    "probe": True,
+    "probe_tolerance": 24.0,
+    "probe_min_ratio": 0.8,
+    "probe_full_scan_every": 10,
+    "change_gate": True,
+    "change_threshold": 8.0,
+    "burst_mode": True,
+    "burst_interval": 0.02,
+    "burst_margin": 0.1,
+    "burst_seconds": 1.0,
+    "sub_template": True,
+    "auto_calibrate": True,
+    "calibrated_scale": 0.0,
+    "calibrated_screen": [],
+    "calibrated_reference": "",
+    "notify_destinations": [],
+    "push_server": False,
+    "push_host": "0.0.0.0",
+    "push_port": 8765,
+    "latency_log": "",
 }
 
 
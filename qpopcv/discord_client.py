@@ -1,23 +1,70 @@
-# Discord webhook wrapper.
-# Sends Discord webhook messages with user mentions.
+# Discord webhook transport.
+# Posts pre-serialized webhook payloads over a shared keep-alive session, so
+# repeat sends skip DNS, TCP and TLS setup. Message building, throttling and
+# retries live in `notifier.Notifier`.
+from typing import Optional
+import json
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+
+# Re-warm idle connections before typical server/NAT idle timeouts (~60s).
+KEEP_WARM_SECONDS = 45.0
+
+# Connections kept per host; the notifier runs one worker per connection so
+# concurrent sends never wait on (or discard) pooled sockets.
+POOL_SIZE = 8
+
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+
+
+def get_session() -> requests.Session:
+    # One pooled session for every webhook call in the process.
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def encode_payload(content: str) -> bytes:
+    # Serialize once; the bytes can be posted any number of times.
+    return json.dumps({"content": content}).encode("utf-8")
 
 
-def send_discord_mention(
-    webhook_url: str,
-    user_id: str,
-    message: str,
-    timeout: float = 5.0,
-) -> None:
-    
-    webhook_url = webhook_url.strip()
-    user_id = user_id.strip()
+class WebhookClient:
+    """
+    Keep-alive client for one webhook (or generic JSON push) URL.
+    - `post()` sends pre-serialized JSON bytes on the shared pooled session.
+    - `warm()` opens (or refreshes) the connection with a GET on the webhook,
+      which only returns the webhook's metadata and posts nothing.
+    """
 
-    mention = f"<@{user_id}>"
-    payload = {"content": f"{mention} {message}"}
+    def __init__(self, webhook_url: str, timeout: float = 5.0) -> None:
+        self._url = webhook_url.strip()
+        self._timeout = timeout
+        self._session = get_session()
 
-    requests.post(webhook_url, json=payload, timeout=timeout)
+    @property
+    def url(self) -> str:
+        return self._url
 
+    def post(self, payload: bytes, timeout: Optional[float] = None) -> requests.Response:
+        return self._session.post(
+            self._url,
+            data=payload,
+            headers={"Content-Type": "application/json"},
+            timeout=self._timeout if timeout is None else timeout,
+        )
 
-def send_test_message(webhook_url: str, user_id: str, timeout: float = 5.0) -> None:
-    send_discord_mention(webhook_url, user_id, "connected ✅", timeout=timeout)
\ No newline at end of file
+    def warm(self) -> float:
+        # Returns how long the round trip took, in seconds.
+        started = time.monotonic()
+        self._session.get(self._url, timeout=self._timeout).close()
+        return time.monotonic() - started
@@ -0,0 +1,190 @@
+# Per-detection latency records.
+# Every detection gets a timeline of time.monotonic() stamps (frame capture,
+# match done, LAN push, notification enqueue, HTTP completion per
+# destination). Once all destinations have reported, the timeline is emitted
+# as one structured record through the `qpopcv.latency` logger and,
+# optionally, appended to a JSONL file for fleet-wide p50/p99 analysis.
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import logging
+import threading
+import time
+import uuid
+
+from .async_log import async_handler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HttpResult:
+    completed_at: float  # time.monotonic()
+    ok: bool
+    attempts: int
+
+
+@dataclass
+class DetectionTimeline:
+    event_id: str
+    match: str
+    detected_wall: float  # time.time(), for correlating with other logs
+    captured_at: float  # time.monotonic() right after the frame grab
+    matched_at: float  # time.monotonic() when matching finished
+    pushed_at: Optional[float] = None
+    enqueued_at: Optional[float] = None
+    callback_seconds: Optional[float] = None  # on_detect (GUI) callback
+    expected: List[str] = field(default_factory=list)  # destination names
+    http: Dict[str, HttpResult] = field(default_factory=dict)
+    local_done: bool = False  # detection-side stages are filled in
+
+    @property
+    def complete(self) -> bool:
+        return self.local_done and all(name in self.http for name in self.expected)
+
+    def to_record(self) -> Dict[str, object]:
+        # Durations in ms, None where a stage didn't happen.
+        def ms(start: Optional[float], end: Optional[float]) -> Optional[float]:
+            if start is None or end is None:
+                return None
+            return round((end - start) * 1000.0, 3)
+
+        http_done = [r.completed_at for r in self.http.values()]
+        return {
+            "event_id": self.event_id,
+            "match": self.match,
+            "detected_at": self.detected_wall,
+            "timestamps": {
+                "captured": self.captured_at,
+                "matched": self.matched_at,
+                "pushed": self.pushed_at,
+                "enqueued": self.enqueued_at,
+                "http": {name: r.completed_at for name, r in self.http.items()},
+            },
+            "stages_ms": {
+                "capture_to_match": ms(self.captured_at, self.matched_at),
+                "match_to_push": ms(self.matched_at, self.pushed_at),
+                "match_to_enqueue": ms(self.matched_at, self.enqueued_at),
+                "enqueue_to_http": {
+                    name: ms(self.enqueued_at, r.completed_at)
+                    for name, r in self.http.items()
+                },
+                "callback": ms(0.0, self.callback_seconds),
+                "end_to_end": ms(self.captured_at, max(http_done, default=None)),
+            },
+            "delivery": {
+                name: {"ok": r.ok, "attempts": r.attempts}
+                for name, r in self.http.items()
+            },
+            "missing": [name for name in self.expected if name not in self.http],
+        }
+
+
+class _JsonlFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.latency)
+
+
+class LatencyTracker:
+    """
+    Collects detection timelines until they are complete, then emits them.
+    - `begin()` opens a timeline on the detection thread; the caller fills in
+      `pushed_at`, `enqueued_at` and `callback_seconds` directly.
+    - `expect()` names the destinations the event is about to be queued for;
+      call it before queueing so no HTTP result can arrive unannounced.
+    - `finish()` marks the detection side done; `delivered()` is called from
+      notifier threads as each destination succeeds or is given up on.
+      Whichever completes the timeline emits it.
+    - `close()` emits whatever is still pending and detaches the JSONL sink.
+    """
+
+    def __init__(self, sink_path: Optional[Path] = None) -> None:
+        self._lock = threading.Lock()
+        self._pending: Dict[str, DetectionTimeline] = {}
+        self._sink: Optional[logging.Handler] = None
+        self._sink_queue: Optional[logging.Handler] = None
+        self._sink_listener = None
+        if sink_path is not None:
+            try:
+                self._sink = logging.FileHandler(sink_path, encoding="utf-8")
+            except OSError as exc:
+                logger.warning("Could not open latency log %s: %s", sink_path, exc)
+            else:
+                self._sink.setFormatter(_JsonlFormatter())
+                self._sink.addFilter(lambda record: hasattr(record, "latency"))
+                # File writes happen on the sink's own listener thread.
+                self._sink_queue, self._sink_listener = async_handler(self._sink)
+                logger.addHandler(self._sink_queue)
+
+    def begin(
+        self, match: str, captured_at: float, matched_at: float
+    ) -> DetectionTimeline:
+        return DetectionTimeline(
+            event_id=uuid.uuid4().hex,
+            match=match,
+            detected_wall=time.time(),
+            captured_at=captured_at,
+            matched_at=matched_at,
+        )
+
+    def expect(self, timeline: DetectionTimeline, destinations: List[str]) -> None:
+        with self._lock:
+            timeline.expected = list(destinations)
+            self._pending[timeline.event_id] = timeline
+
+    def cancel_expect(self, timeline: DetectionTimeline) -> None:
+        # Nothing was queued after all (e.g. throttled).
+        with self._lock:
+            timeline.expected = []
+            self._pending.pop(timeline.event_id, None)
+
+    def finish(self, timeline: DetectionTimeline) -> None:
+        with self._lock:
+            timeline.local_done = True
+            if not timeline.complete:
+                return
+            self._pending.pop(timeline.event_id, None)
+        self._emit(timeline)
+
+    def delivered(
+        self,
+        event_id: str,
+        destination: str,
+        ok: bool,
+        attempts: int,
+        completed_at: float,
+    ) -> None:
+        with self._lock:
+            timeline = self._pending.get(event_id)
+            if timeline is None:
+                return
+            timeline.http[destination] = HttpResult(completed_at, ok, attempts)
+            if not timeline.complete:
+                return
+            del self._pending[event_id]
+        self._emit(timeline)
+
+    def close(self) -> None:
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for timeline in pending:
+            self._emit(timeline)
+        if self._sink is not None:
+            logger.removeHandler(self._sink_queue)
+            self._sink_listener.stop()
+            self._sink.close()
+            self._sink = None
+
+    def _emit(self, timeline: DetectionTimeline) -> None:
+        record = timeline.to_record()
+        stages = record["stages_ms"]
+        logger.info(
+            "Detection latency (%s): capture->match %s ms, match->enqueue %s ms, "
+            "end-to-end %s ms",
+            timeline.match,
+            stages["capture_to_match"],
+            stages["match_to_enqueue"],
+            stages["end_to_end"],
+            extra={"latency": record},
+        )
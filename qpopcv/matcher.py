@@ -0,0 +1,807 @@
+# OpenCV template matching engine for the queue watcher.
+# Converts prepared references into grayscale templates once and matches them
+# against a single per-frame array, reusing result buffers between ticks.
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# References may be PIL images or uint8 arrays (gray, RGB or RGBA).
+ImageLike = Union[Image.Image, np.ndarray]
+
+# Same normalized score pyautogui/pyscreeze uses for `confidence`.
+MATCH_METHOD = cv2.TM_CCOEFF_NORMED
+
+MATCH_MODES = ("direct", "pyramid", "fft", "tiled")
+
+# Window variance below this is treated as a flat patch (score 0).
+FLAT_VARIANCE_EPS = 1e-3
+
+# Sub-template stage: peaks to verify and full-resolution slack around each.
+PATCH_CANDIDATES = 3
+PATCH_PAD = 2
+
+# Sparse probe: pixels sampled per template on a PROBE_GRID grid.
+PROBE_GRID = (8, 6)
+
+# Templates smaller than this (in either dimension) after downscaling are
+# matched at full resolution instead; the coarse score gets too noisy.
+MIN_COARSE_TEMPLATE_SIZE = 12
+
+
+@dataclass
+class MatchResult:
+    name: str
+    score: float
+    location: Tuple[int, int]  # top-left (x, y) inside the frame
+    size: Tuple[int, int]  # (width, height) of the matched template
+
+
+@dataclass
+class Template:
+    name: str
+    image: np.ndarray  # contiguous uint8 grayscale
+    hits: int = 0  # full-scan detections, drives try order
+    patch: Optional[np.ndarray] = None  # compact discriminative sub-template
+    patch_offset: Tuple[int, int] = (0, 0)  # patch top-left inside `image`
+    probe_points: Optional[np.ndarray] = None  # (N, 2) int (x, y) inside `image`
+    probe_values: Optional[np.ndarray] = None  # (N,) int16 gray values there
+
+    @property
+    def width(self) -> int:
+        return int(self.image.shape[1])
+
+    @property
+    def height(self) -> int:
+        return int(self.image.shape[0])
+
+
+def to_gray(image: ImageLike) -> np.ndarray:
+    # Convert a PIL image or an RGB/RGBA/gray array into contiguous uint8 gray.
+    if isinstance(image, Image.Image):
+        if image.mode != "L":
+            image = image.convert("L")
+        return np.ascontiguousarray(np.asarray(image, dtype=np.uint8))
+
+    array = np.asarray(image)
+    if array.dtype != np.uint8:
+        array = array.astype(np.uint8)
+
+    if array.ndim == 2:
+        return np.ascontiguousarray(array)
+    if array.shape[2] == 4:
+        return cv2.cvtColor(array, cv2.COLOR_RGBA2GRAY)
+    if array.shape[2] == 3:
+        return cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
+    return np.ascontiguousarray(array[:, :, 0])
+
+
+def select_probe_points(image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pick characteristic pixels of a gray template for the sparse probe.
+
+    One pixel per PROBE_GRID cell: the one furthest from the template's mean
+    gray (title text, border colors) among pixels whose 3x3 neighbourhood is
+    flat, so a one-pixel shift doesn't flip the probe.
+    """
+    height, width = image.shape[:2]
+    as_float = image.astype(np.float32)
+    local_mean = cv2.blur(as_float, (3, 3))
+    local_var = cv2.blur(as_float * as_float, (3, 3)) - local_mean * local_mean
+    distinct = np.abs(as_float - float(as_float.mean()))
+    # Penalize busy neighbourhoods (std above ~8 gray levels).
+    score = distinct - np.sqrt(np.maximum(local_var, 0.0)) * 4.0
+
+    cols, rows = PROBE_GRID
+    points: List[Tuple[int, int]] = []
+    for gy in range(rows):
+        y0, y1 = gy * height // rows, (gy + 1) * height // rows
+        for gx in range(cols):
+            x0, x1 = gx * width // cols, (gx + 1) * width // cols
+            if y1 <= y0 or x1 <= x0:
+                continue
+            cell = score[y0:y1, x0:x1]
+            cy, cx = np.unravel_index(int(np.argmax(cell)), cell.shape)
+            points.append((x0 + int(cx), y0 + int(cy)))
+
+    coords = np.array(points, dtype=np.intp).reshape(-1, 2)
+    values = image[coords[:, 1], coords[:, 0]].astype(np.int16)
+    return coords, values
+
+
+def crop_frame(frame, box: Tuple[int, int, int, int]):
+    # Crop a PIL image or array to (x0, y0, x1, y1) without converting it.
+    x0, y0, x1, y1 = box
+    if isinstance(frame, Image.Image):
+        return frame.crop(box)
+    return np.asarray(frame)[y0:y1, x0:x1]
+
+
+def frame_size(frame) -> Tuple[int, int]:
+    if isinstance(frame, Image.Image):
+        return frame.size
+    shape = np.asarray(frame).shape
+    return int(shape[1]), int(shape[0])
+
+
+class TemplateMatcher:
+    """
+    Direct `cv2.matchTemplate` engine.
+    - Templates are converted to grayscale numpy arrays once, at construction.
+    - Each frame is converted once and shared by every template.
+    - Score buffers are kept per template and reused while the frame size
+      stays the same.
+    - Templates are tried in order of past hits and matching stops at the
+      first one that reaches `confidence`.
+    - With `set_patch`, a compact sub-template finds candidates first and the
+      full template only verifies them.
+    """
+
+    def __init__(
+        self,
+        references: Sequence[Tuple[str, ImageLike]],
+        confidence: float,
+        workers: int = 1,
+    ) -> None:
+        self._confidence = float(confidence)
+        self._workers = max(1, int(workers))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._templates: List[Template] = [
+            Template(name=name, image=to_gray(reference))
+            for name, reference in references
+        ]
+        for template in self._templates:
+            template.probe_points, template.probe_values = select_probe_points(
+                template.image
+            )
+        self._by_name: Dict[str, Template] = {t.name: t for t in self._templates}
+        self._result_buffers: Dict[Tuple[str, str], np.ndarray] = {}
+        self._gray: Optional[np.ndarray] = None
+        self._last_score: float = -1.0
+        self._last_probe_ratio: float = 1.0
+
+    # --------- Public API ---------
+
+    @property
+    def templates(self) -> List[Template]:
+        return self._templates
+
+    @property
+    def confidence(self) -> float:
+        return self._confidence
+
+    @property
+    def last_score(self) -> float:
+        # Best score seen by the last `match`/`match_at` call, hit or not;
+        # -1.0 when nothing was scored or the last `probe` failed.
+        return self._last_score
+
+    @property
+    def last_probe_ratio(self) -> float:
+        # Share of probe pixels the last `probe` found in place (1.0 when it
+        # could not sample and passed by default).
+        return self._last_probe_ratio
+
+    def prepare_frame(self, frame) -> np.ndarray:
+        # Color arrays are converted into one reused gray buffer, so the
+        # result is only valid until the next call.
+        if (
+            isinstance(frame, np.ndarray)
+            and frame.ndim == 3
+            and frame.dtype == np.uint8
+            and frame.shape[2] in (3, 4)
+        ):
+            if self._gray is None or self._gray.shape != frame.shape[:2]:
+                self._gray = np.empty(frame.shape[:2], dtype=np.uint8)
+            code = cv2.COLOR_RGBA2GRAY if frame.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+            cv2.cvtColor(frame, code, dst=self._gray)
+            return self._gray
+        return to_gray(frame)
+
+    def match(self, frame) -> Optional[MatchResult]:
+        # Return the first template whose best score reaches `confidence`,
+        # trying the most frequently matched templates first.
+        gray = self.prepare_frame(frame)
+        return self._first_hit(lambda template: self._match_template(gray, template))
+
+    def probe(
+        self,
+        frame: np.ndarray,
+        anchor: MatchResult,
+        tolerance: float,
+        min_ratio: float,
+    ) -> bool:
+        # Sample the anchor template's probe pixels at its last location in a
+        # gray frame; True when at least `min_ratio` of them are within
+        # `tolerance` gray levels. Costs a few dozen pixel reads.
+        self._last_probe_ratio = 1.0
+        template = self._by_name.get(anchor.name)
+        if template is None or template.probe_points is None:
+            return True
+
+        x, y = anchor.location
+        if (
+            x < 0
+            or y < 0
+            or x + template.width > frame.shape[1]
+            or y + template.height > frame.shape[0]
+        ):
+            return True
+
+        points = template.probe_points
+        sampled = frame[y + points[:, 1], x + points[:, 0]].astype(np.int16)
+        close = np.abs(sampled - template.probe_values) <= tolerance
+        self._last_probe_ratio = float(close.mean())
+        if self._last_probe_ratio < min_ratio:
+            self._last_score = -1.0
+            return False
+        return True
+
+    def set_patch(self, rel: Optional[Tuple[float, float, float, float]]) -> None:
+        # Use a sub-template, given as (x, y, w, h) fractions of each template,
+        # as a first stage; None goes back to full-template matching.
+        for template in self._templates:
+            template.patch = None
+            template.patch_offset = (0, 0)
+            if rel is None:
+                continue
+
+            x = int(round(rel[0] * template.width))
+            y = int(round(rel[1] * template.height))
+            w = int(round(rel[2] * template.width))
+            h = int(round(rel[3] * template.height))
+            w, h = min(w, template.width - x), min(h, template.height - y)
+            if w < 1 or h < 1:
+                continue
+
+            template.patch = np.ascontiguousarray(template.image[y : y + h, x : x + w])
+            template.patch_offset = (x, y)
+
+    def close(self) -> None:
+        # Release the worker pool; it is recreated on demand.
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def match_at(self, frame, last: MatchResult, pad: int) -> Optional[MatchResult]:
+        # Re-check only the template from `last`, in a window padded by `pad`
+        # around its previous location. Only that window is converted.
+        template = self._by_name.get(last.name)
+        if template is None:
+            return None
+
+        frame_w, frame_h = frame_size(frame)
+        x, y = last.location
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1 = min(frame_w, x + template.width + pad)
+        y1 = min(frame_h, y + template.height + pad)
+
+        window = to_gray(crop_frame(frame, (x0, y0, x1, y1)))
+        result = self._match_window(
+            window, template, 0, 0, window.shape[1], window.shape[0], tag="lock"
+        )
+        self._last_score = result.score if result is not None else -1.0
+        if result is None or result.score < self._confidence:
+            return None
+
+        result.location = (x0 + result.location[0], y0 + result.location[1])
+        return result
+
+    # --------- Internal Helpers ---------
+
+    def _ordered_templates(self) -> List[Template]:
+        # Highest hit count first; ties keep the reference order.
+        return sorted(self._templates, key=lambda t: -t.hits)
+
+    def _first_hit(
+        self,
+        score: Callable[[Template], Optional[MatchResult]],
+    ) -> Optional[MatchResult]:
+        # Run `score` over the ordered templates and return the first result
+        # (in that order) reaching `confidence`. With workers > 1 templates are
+        # scored concurrently; OpenCV releases the GIL while matching.
+        ordered = self._ordered_templates()
+        self._last_score = -1.0
+
+        if self._workers <= 1 or len(ordered) <= 1:
+            for template in ordered:
+                result = score(template)
+                if result is not None:
+                    self._last_score = max(self._last_score, result.score)
+                if result is not None and result.score >= self._confidence:
+                    template.hits += 1
+                    return result
+            return None
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._workers, thread_name_prefix="qpopcv-match"
+            )
+        futures: List[Future] = [self._executor.submit(score, t) for t in ordered]
+
+        try:
+            for template, future in zip(ordered, futures):
+                result = future.result()
+                if result is not None:
+                    self._last_score = max(self._last_score, result.score)
+                if result is not None and result.score >= self._confidence:
+                    template.hits += 1
+                    return result
+            return None
+        finally:
+            # Don't let stragglers write into shared buffers during the next
+            # frame: drop what hasn't started and wait for what has.
+            for future in futures:
+                future.cancel()
+            wait(futures)
+
+    def _result_buffer(self, key: Tuple[str, str], rows: int, cols: int) -> np.ndarray:
+        # Reuse the score buffer for `key` while its shape stays the same.
+        buf = self._result_buffers.get(key)
+        if buf is None or buf.shape != (rows, cols):
+            buf = np.empty((rows, cols), dtype=np.float32)
+            self._result_buffers[key] = buf
+        return buf
+
+    def _score_map(
+        self,
+        frame: np.ndarray,
+        templ: np.ndarray,
+        key: Tuple[str, str],
+    ) -> Optional[np.ndarray]:
+        rows = frame.shape[0] - templ.shape[0] + 1
+        cols = frame.shape[1] - templ.shape[1] + 1
+        if rows <= 0 or cols <= 0:
+            return None
+
+        return cv2.matchTemplate(
+            frame,
+            templ,
+            MATCH_METHOD,
+            result=self._result_buffer(key, rows, cols),
+        )
+
+    def _match_window(
+        self,
+        frame: np.ndarray,
+        template: Template,
+        x0: int,
+        y0: int,
+        x1: int,
+        y1: int,
+        tag: str = "window",
+    ) -> Optional[MatchResult]:
+        # Match `template` only inside frame[y0:y1, x0:x1] (clamped to the frame).
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(frame.shape[1], x1), min(frame.shape[0], y1)
+
+        scores = self._score_map(
+            frame[y0:y1, x0:x1], template.image, (tag, template.name)
+        )
+        if scores is None:
+            return None
+        _, max_val, _, max_loc = cv2.minMaxLoc(scores)
+
+        return MatchResult(
+            name=template.name,
+            score=float(max_val),
+            location=(x0 + int(max_loc[0]), y0 + int(max_loc[1])),
+            size=(template.width, template.height),
+        )
+
+    def _top_candidates(
+        self,
+        scores: np.ndarray,
+        templ_shape: Tuple[int, ...],
+        count: int,
+    ) -> List[Tuple[int, int]]:
+        # Pick the best peaks, suppressing a half-template area around each.
+        # The buffer is scratch space and gets overwritten on the next tick.
+        suppress_w = max(1, templ_shape[1] // 2)
+        suppress_h = max(1, templ_shape[0] // 2)
+
+        peaks: List[Tuple[int, int]] = []
+        for _ in range(count):
+            _, max_val, _, (px, py) = cv2.minMaxLoc(scores)
+            if not np.isfinite(max_val) or max_val <= -1.0:
+                break
+            peaks.append((int(px), int(py)))
+            scores[
+                max(0, py - suppress_h) : py + suppress_h + 1,
+                max(0, px - suppress_w) : px + suppress_w + 1,
+            ] = -1.0
+        return peaks
+
+
+    def _confirm_candidates(
+        self,
+        frame: np.ndarray,
+        template: Template,
+        positions: List[Tuple[int, int]],
+        pad: int,
+    ) -> Optional[MatchResult]:
+        # Score the full template in a small window around each candidate
+        # top-left; return the first confirmed hit, else the best score seen.
+        best: Optional[MatchResult] = None
+        for x, y in positions:
+            result = self._match_window(
+                frame,
+                template,
+                x - pad,
+                y - pad,
+                x + template.width + pad,
+                y + template.height + pad,
+            )
+            if result is None:
+                continue
+            if result.score >= self._confidence:
+                return result
+            if best is None or result.score > best.score:
+                best = result
+
+        return best
+
+    def _match_template(
+        self,
+        frame: np.ndarray,
+        template: Template,
+    ) -> Optional[MatchResult]:
+        if template.patch is not None:
+            return self._match_patch(frame, template)
+        return self._match_window(
+            frame, template, 0, 0, frame.shape[1], frame.shape[0], tag="full"
+        )
+
+    def _match_patch(
+        self,
+        frame: np.ndarray,
+        template: Template,
+    ) -> Optional[MatchResult]:
+        # Find candidates with the compact patch, verify with the full template.
+        scores = self._score_map(frame, template.patch, ("patch", template.name))
+        if scores is None:
+            return None
+
+        offset_x, offset_y = template.patch_offset
+        positions = [
+            (px - offset_x, py - offset_y)
+            for px, py in self._top_candidates(
+                scores, template.patch.shape, PATCH_CANDIDATES
+            )
+        ]
+        return self._confirm_candidates(frame, template, positions, PATCH_PAD)
+
+
+class PyramidMatcher(TemplateMatcher):
+    """
+    Coarse-to-fine variant of `TemplateMatcher`.
+    - Templates and the frame are downscaled by `scale` and matched coarsely
+      to pick the `candidates` best locations per template.
+    - Each candidate is confirmed at full resolution in a small window around
+      it, so the reported score (and `confidence`) means the same as in
+      direct mode.
+    """
+
+    def __init__(
+        self,
+        references: Sequence[Tuple[str, ImageLike]],
+        confidence: float,
+        scale: float = 0.25,
+        candidates: int = 3,
+        workers: int = 1,
+    ) -> None:
+        super().__init__(references, confidence, workers=workers)
+        self._scale = min(1.0, max(0.05, float(scale)))
+        self._candidates = max(1, int(candidates))
+        # Full-resolution slack around each coarse hit (covers rounding).
+        self._pad = int(np.ceil(1.0 / self._scale)) + 2
+
+        self._coarse: Dict[str, np.ndarray] = {}
+        for template in self._templates:
+            coarse_w = int(round(template.width * self._scale))
+            coarse_h = int(round(template.height * self._scale))
+            if min(coarse_w, coarse_h) >= MIN_COARSE_TEMPLATE_SIZE:
+                self._coarse[template.name] = cv2.resize(
+                    template.image, (coarse_w, coarse_h), interpolation=cv2.INTER_AREA
+                )
+
+    def match(self, frame) -> Optional[MatchResult]:
+        gray = self.prepare_frame(frame)
+        coarse_frame = cv2.resize(
+            gray,
+            (
+                max(1, int(round(gray.shape[1] * self._scale))),
+                max(1, int(round(gray.shape[0] * self._scale))),
+            ),
+            interpolation=cv2.INTER_AREA,
+        )
+
+        return self._first_hit(
+            lambda template: self._match_pyramid(gray, coarse_frame, template)
+        )
+
+    def _match_pyramid(
+        self,
+        frame: np.ndarray,
+        coarse_frame: np.ndarray,
+        template: Template,
+    ) -> Optional[MatchResult]:
+        coarse_templ = self._coarse.get(template.name)
+        if coarse_templ is None:
+            return self._match_template(frame, template)
+
+        scores = self._score_map(coarse_frame, coarse_templ, ("coarse", template.name))
+        if scores is None:
+            return None
+
+        positions = [
+            (int(round(cx / self._scale)), int(round(cy / self._scale)))
+            for cx, cy in self._top_candidates(
+                scores, coarse_templ.shape, self._candidates
+            )
+        ]
+        return self._confirm_candidates(frame, template, positions, self._pad)
+
+
+@dataclass
+class _Spectrum:
+    template: Template
+    spectrum: np.ndarray  # CCS-packed DFT of the zero-mean padded template
+    norm: float  # sqrt(sum((t - mean(t)) ** 2))
+
+
+class FFTMatcher(TemplateMatcher):
+    """
+    Frequency-domain variant of `TemplateMatcher`.
+    - Each frame is transformed once; every template and scale variant reuses
+      that spectrum, so extra variants cost one multiply + inverse DFT each.
+    - Zero-mean template spectra are cached per padded frame size.
+    - Window sums for normalization come from one integral image per frame.
+    Scores are TM_CCOEFF_NORMED, so `confidence` means the same as in direct
+    mode.
+    """
+
+    def __init__(
+        self,
+        references: Sequence[Tuple[str, ImageLike]],
+        confidence: float,
+        workers: int = 1,
+    ) -> None:
+        super().__init__(references, confidence, workers=workers)
+        self._dft_shape: Optional[Tuple[int, int]] = None
+        self._spectra: Dict[str, _Spectrum] = {}
+        self._padded: Optional[np.ndarray] = None
+
+    def match(self, frame) -> Optional[MatchResult]:
+        gray = self.prepare_frame(frame)
+        height, width = gray.shape
+        self._ensure_spectra(height, width)
+
+        self._padded[:height, :width] = gray
+        frame_spectrum = cv2.dft(self._padded)
+        sums, sq_sums = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+
+        def score(template: Template) -> Optional[MatchResult]:
+            spec = self._spectra.get(template.name)
+            if spec is None:
+                return None
+            return self._match_spectrum(
+                frame_spectrum, sums, sq_sums, height, width, spec
+            )
+
+        return self._first_hit(score)
+
+    # --------- Internal Helpers ---------
+
+    def _ensure_spectra(self, height: int, width: int) -> None:
+        # (Re)build padded buffers and template spectra when the frame size
+        # changes. Circular correlation on a size >= frame size leaves every
+        # fully-overlapping position free of wrap-around.
+        dft_shape = (cv2.getOptimalDFTSize(height), cv2.getOptimalDFTSize(width))
+        if dft_shape == self._dft_shape:
+            return
+
+        self._dft_shape = dft_shape
+        self._padded = np.zeros(dft_shape, dtype=np.float32)
+        self._spectra = {}
+
+        for template in self._templates:
+            if template.height > height or template.width > width:
+                continue
+
+            centered = template.image.astype(np.float32)
+            centered -= float(centered.mean())
+            padded = np.zeros(dft_shape, dtype=np.float32)
+            padded[: template.height, : template.width] = centered
+
+            self._spectra[template.name] = _Spectrum(
+                template=template,
+                spectrum=cv2.dft(padded),
+                norm=float(np.sqrt(np.sum(centered.astype(np.float64) ** 2))),
+            )
+
+    def _match_spectrum(
+        self,
+        frame_spectrum: np.ndarray,
+        sums: np.ndarray,
+        sq_sums: np.ndarray,
+        height: int,
+        width: int,
+        spec: _Spectrum,
+    ) -> Optional[MatchResult]:
+        template = spec.template
+        th, tw = template.height, template.width
+        rows, cols = height - th + 1, width - tw + 1
+        if spec.norm <= 0.0:
+            return None
+
+        product = cv2.mulSpectrums(frame_spectrum, spec.spectrum, 0, conjB=True)
+        corr = cv2.idft(product, flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)
+
+        # Per-window variance of the frame (times the window area), from the
+        # integral images; computed in place to keep temporaries down.
+        win_sum = sums[th:, tw:] - sums[:rows, tw:]
+        win_sum -= sums[th:, :cols]
+        win_sum += sums[:rows, :cols]
+        variance = sq_sums[th:, tw:] - sq_sums[:rows, tw:]
+        variance -= sq_sums[th:, :cols]
+        variance += sq_sums[:rows, :cols]
+        win_sum *= win_sum
+        win_sum /= float(th * tw)
+        variance -= win_sum
+
+        # Flat windows get an infinite denominator, i.e. a score of 0.
+        flat = variance <= FLAT_VARIANCE_EPS
+        np.sqrt(np.maximum(variance, 0.0, out=variance), out=variance)
+        variance *= spec.norm
+        variance[flat] = np.inf
+
+        scores = self._result_buffer(("fft", template.name), rows, cols)
+        np.divide(corr[:rows, :cols], variance, out=scores, casting="unsafe")
+        _, max_val, _, max_loc = cv2.minMaxLoc(scores)
+
+        return MatchResult(
+            name=template.name,
+            score=float(max_val),
+            location=(int(max_loc[0]), int(max_loc[1])),
+            size=(tw, th),
+        )
+
+
+class TiledMatcher(TemplateMatcher):
+    """
+    Incremental variant of `TemplateMatcher` for partially changing frames.
+    - The frame is split into `tile_size` tiles and diffed against the frame
+      the cached score maps were computed from; that reference only advances
+      in re-scored tiles, so a slow fade-in still adds up.
+    - Only score positions whose template window overlaps a changed tile are
+      re-scored; every other position keeps its cached score.
+    - When more than `max_dirty_ratio` of the tiles changed (or the frame
+      size changed) everything is re-scored in one pass.
+    """
+
+    def __init__(
+        self,
+        references: Sequence[Tuple[str, ImageLike]],
+        confidence: float,
+        tile_size: int = 64,
+        pixel_threshold: float = 8.0,
+        max_dirty_ratio: float = 0.5,
+        workers: int = 1,
+    ) -> None:
+        super().__init__(references, confidence, workers=workers)
+        self._tile_size = max(8, int(tile_size))
+        self._pixel_threshold = float(pixel_threshold)
+        self._max_dirty_ratio = float(max_dirty_ratio)
+
+        self._previous: Optional[np.ndarray] = None
+        # Templates whose cached score map matches `self._previous`.
+        self._valid: Set[str] = set()
+
+    def match(self, frame) -> Optional[MatchResult]:
+        gray = self.prepare_frame(frame)
+        dirty = self._dirty_rects(gray)
+
+        # The reference only advances where scores get recomputed, so changes
+        # below `pixel_threshold` add up until their tile is re-scored.
+        if dirty is None:
+            if self._previous is None or self._previous.shape != gray.shape:
+                self._previous = np.empty_like(gray)
+            np.copyto(self._previous, gray)
+        else:
+            for x0, y0, x1, y1 in dirty:
+                self._previous[y0:y1, x0:x1] = gray[y0:y1, x0:x1]
+
+        updated: Set[str] = set()
+
+        def score(template: Template) -> Optional[MatchResult]:
+            result = self._update_template(gray, template, dirty)
+            updated.add(template.name)
+            return result
+
+        result = self._first_hit(score)
+        # Templates skipped by the early exit did not see this frame.
+        self._valid &= updated
+        return result
+
+    # --------- Internal Helpers ---------
+
+    def _dirty_rects(self, gray: np.ndarray) -> Optional[List[Tuple[int, int, int, int]]]:
+        # Changed areas as (x0, y0, x1, y1) pixel rects, or None for "all".
+        previous = self._previous
+        if previous is None or previous.shape != gray.shape:
+            return None
+
+        tile = self._tile_size
+        height, width = gray.shape
+        changed = cv2.absdiff(gray, previous) > self._pixel_threshold
+
+        grid_h = -(-height // tile)
+        grid_w = -(-width // tile)
+        padded = np.zeros((grid_h * tile, grid_w * tile), dtype=bool)
+        padded[:height, :width] = changed
+        tiles = padded.reshape(grid_h, tile, grid_w, tile).any(axis=(1, 3))
+
+        dirty_count = int(tiles.sum())
+        if dirty_count == 0:
+            return []
+        if dirty_count > self._max_dirty_ratio * tiles.size:
+            return None
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(
+            tiles.astype(np.uint8), connectivity=8
+        )
+        rects: List[Tuple[int, int, int, int]] = []
+        for label in range(1, count):
+            gx, gy, gw, gh = (int(v) for v in stats[label, :4])
+            rects.append(
+                (
+                    gx * tile,
+                    gy * tile,
+                    min(width, (gx + gw) * tile),
+                    min(height, (gy + gh) * tile),
+                )
+            )
+        return rects
+
+    def _update_template(
+        self,
+        frame: np.ndarray,
+        template: Template,
+        dirty: Optional[List[Tuple[int, int, int, int]]],
+    ) -> Optional[MatchResult]:
+        th, tw = template.height, template.width
+        rows = frame.shape[0] - th + 1
+        cols = frame.shape[1] - tw + 1
+        if rows <= 0 or cols <= 0:
+            return None
+
+        key = ("full", template.name)
+        cached = self._result_buffers.get(key)
+        if dirty is None or template.name not in self._valid or cached is None:
+            scores = self._score_map(frame, template.image, key)
+            self._valid.add(template.name)
+        else:
+            scores = cached
+            for x0, y0, x1, y1 in dirty:
+                # Positions whose window [x, x + tw) x [y, y + th) touches the rect.
+                sx0, sy0 = max(0, x0 - tw + 1), max(0, y0 - th + 1)
+                sx1, sy1 = min(cols, x1), min(rows, y1)
+                if sx0 >= sx1 or sy0 >= sy1:
+                    continue
+                scores[sy0:sy1, sx0:sx1] = cv2.matchTemplate(
+                    frame[sy0 : sy1 + th - 1, sx0 : sx1 + tw - 1],
+                    template.image,
+                    MATCH_METHOD,
+                )
+
+        _, max_val, _, max_loc = cv2.minMaxLoc(scores)
+        return MatchResult(
+            name=template.name,
+            score=float(max_val),
+            location=(int(max_loc[0]), int(max_loc[1])),
+            size=(tw, th),
+        )
@@ -0,0 +1,522 @@
+# Notification service and background dispatch for the watcher and the UI.
+# Detection events go into a durable outbox, one entry per destination, and
+# are sent concurrently by a small worker pool, so neither a slow webhook nor
+# a slow destination holds up capture, matching or the other destinations.
+# Failed sends are retried with backoff; while idle the dispatcher keeps the
+# connections warm.
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+import json
+import logging
+import threading
+import time
+
+import requests
+
+from .discord_client import (
+    KEEP_WARM_SECONDS,
+    POOL_SIZE,
+    WebhookClient,
+    encode_payload,
+)
+from .outbox import NotificationOutbox, OutboxEntry, retry_delay
+
+logger = logging.getLogger(__name__)
+
+DESTINATION_KINDS = ("discord", "http")
+DISPATCH_WORKERS = POOL_SIZE  # one pooled connection each
+
+# Minimum seconds between two popup notifications (and between two tests).
+THROTTLE_SECONDS = 15
+
+POPUP_MESSAGE = "Your Queue has popped!"
+TEST_MESSAGE = "connected ✅"
+
+
+@dataclass
+class Destination:
+    name: str
+    url: str
+    kind: str = "discord"  # "discord" webhook or generic JSON "http" push
+    timeout: float = 5.0
+    user_id: str = ""  # Discord user to mention (discord kind only)
+
+
+def parse_destinations(items: object) -> List[Destination]:
+    # `notify_destinations` config entries -> Destinations; bad ones are skipped.
+    destinations: List[Destination] = []
+    for index, item in enumerate(items or []):
+        try:
+            url = str(item["url"]).strip()
+            kind = str(item.get("kind", "discord")).strip().lower()
+            if not url or kind not in DESTINATION_KINDS:
+                raise ValueError(f"bad url or kind {kind!r}")
+            destinations.append(
+                Destination(
+                    name=str(item.get("name", "")).strip() or f"{kind}-{index + 1}",
+                    url=url,
+                    kind=kind,
+                    timeout=float(item.get("timeout", 5.0)),
+                    user_id=str(item.get("user_id", "")).strip(),
+                )
+            )
+        except Exception as e:
+            logger.warning("Ignoring notify destination #%d: %s", index + 1, e)
+    return destinations
+
+
+def build_payload(destination: Destination, message: str) -> bytes:
+    # Request body for `message` in the destination's format.
+    if destination.kind == "http":
+        return json.dumps({"event": "queue_pop", "message": message}).encode("utf-8")
+    if destination.user_id:
+        message = f"<@{destination.user_id}> {message}"
+    return encode_payload(message)
+
+
+@dataclass
+class DestinationStats:
+    sent: int = 0
+    errors: int = 0  # failed attempts, retried or not
+    total_seconds: float = 0.0  # HTTP time of successful sends
+    last_seconds: float = 0.0
+
+    @property
+    def average_seconds(self) -> float:
+        return self.total_seconds / self.sent if self.sent else 0.0
+
+
+@dataclass
+class DispatchStats:
+    sent: int = 0
+    failed: int = 0  # given up on (permanent errors)
+    retries: int = 0
+    rate_limited: int = 0
+    total_latency: float = 0.0  # enqueue -> send complete, summed over sends
+    last_latency: float = 0.0
+    destinations: Dict[str, DestinationStats] = field(default_factory=dict)
+
+    @property
+    def average_latency(self) -> float:
+        return self.total_latency / self.sent if self.sent else 0.0
+
+
+def rate_limit_delay(response: requests.Response) -> Optional[float]:
+    # Seconds to wait after a 429, from `Retry-After` or Discord's JSON body.
+    header = response.headers.get("Retry-After")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            pass
+    try:
+        return max(0.0, float(response.json()["retry_after"]))
+    except Exception:
+        return None
+
+
+class NotificationDispatcher:
+    """
+    Coordinator thread draining a `NotificationOutbox` into a worker pool.
+    - `submit()` writes one entry per destination to the outbox (one file
+      write per event) and wakes the coordinator; it never touches the network.
+    - Due entries are handed to up to DISPATCH_WORKERS threads at once; each
+      request uses its destination's own timeout, and the coordinator never
+      waits on a request, so a slow destination can't delay the others.
+    - Per event it reports enqueue-to-send latency (outbox wait + HTTP); per
+      destination it records HTTP time in `stats.destinations`. `on_result`
+      (if given) hears about every entry that is sent or given up on.
+    - 2xx removes the entry. 429 waits for `Retry-After`; network errors and
+      5xx back off exponentially; other 4xx are dropped as permanent.
+    - With `keep_warm`, and while `set_keep_warm(True)` is in effect, the
+      pool calls it right away (to connect before the first event) and
+      again after every `keep_warm_seconds` idle.
+    - `close()` flushes entries that are due now, then stops. Anything still
+      waiting for a retry stays in the outbox for the next start.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, bytes, float], requests.Response],
+        outbox: NotificationOutbox,
+        keep_warm: Optional[Callable[[], object]] = None,
+        keep_warm_seconds: float = 45.0,
+        on_result: Optional[Callable[[OutboxEntry, bool, float], None]] = None,
+    ) -> None:
+        self._send = send
+        self._outbox = outbox
+        self._on_result = on_result
+        self._keep_warm = keep_warm
+        self._keep_warm_seconds = keep_warm_seconds
+        self._cond = threading.Condition()
+        self._pending = False
+        self._closing = False
+        self._in_flight: Set[str] = set()
+        self._warm_enabled = keep_warm is not None
+        self._last_io = time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats_lock = threading.Lock()
+        self.stats = DispatchStats()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._closing = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=DISPATCH_WORKERS, thread_name_prefix="qpopcv-send"
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="qpopcv-notify", daemon=True
+        )
+        self._thread.start()
+
+    def submit(
+        self,
+        messages: List[Tuple[Destination, bytes]],
+        event_id: str = "",
+    ) -> None:
+        # One outbox entry per (destination, payload) pair, saved in one write.
+        self._outbox.add_all(
+            [(d.url, payload, d.name, d.timeout) for d, payload in messages],
+            event_id,
+        )
+        self._wake()
+
+    def close(self, timeout: float = 10.0) -> None:
+        if self._thread is None:
+            return
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        # Still busy: the coordinator finishes its in-flight sends and exits
+        # on its own; anything undelivered stays in the outbox for next time.
+        if not self._thread.is_alive() and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._thread = None
+
+    def set_keep_warm(self, enabled: bool) -> None:
+        # Turning it on warms immediately (on the next coordinator pass).
+        enabled = enabled and self._keep_warm is not None
+        if enabled and not self._warm_enabled:
+            self._last_io = float("-inf")
+        self._warm_enabled = enabled
+        self._wake()
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._pending = True
+            self._cond.notify()
+
+    def _run(self) -> None:
+        if self._warm_enabled:
+            self._warm()
+        while True:
+            with self._cond:
+                in_flight = set(self._in_flight)
+            for entry in self._outbox.due(exclude=in_flight):
+                self._dispatch(entry)
+
+            with self._cond:
+                if self._closing and not self._in_flight:
+                    break
+                in_flight = set(self._in_flight)
+            warming = self._warm_enabled and not self._closing
+            if warming and time.monotonic() - self._last_io >= self._keep_warm_seconds:
+                self._warm()
+                continue
+
+            # Sleep until an entry is due, it's time to re-warm, or a wake-up
+            # (new event, finished request, close).
+            timeout: Optional[float] = None
+            if warming:
+                timeout = self._keep_warm_seconds - (time.monotonic() - self._last_io)
+            until_due = self._outbox.seconds_until_due(exclude=in_flight)
+            if until_due is not None:
+                timeout = until_due if timeout is None else min(timeout, until_due)
+            with self._cond:
+                if not self._pending:
+                    self._cond.wait(None if timeout is None else max(0.0, timeout))
+                self._pending = False
+
+    def _dispatch(self, entry: OutboxEntry) -> None:
+        with self._cond:
+            self._in_flight.add(entry.id)
+        future = self._executor.submit(self._deliver, entry)
+        future.add_done_callback(lambda _f, entry_id=entry.id: self._finished(entry_id))
+
+    def _finished(self, entry_id: str) -> None:
+        with self._cond:
+            self._in_flight.discard(entry_id)
+            self._pending = True
+            self._cond.notify()
+
+    def _destination_stats(self, entry: OutboxEntry) -> DestinationStats:
+        # Called with `_stats_lock` held.
+        key = entry.name or entry.url
+        return self.stats.destinations.setdefault(key, DestinationStats())
+
+    def _deliver(self, entry: OutboxEntry) -> None:
+        label = entry.name or "webhook"
+        send_start = time.monotonic()
+        try:
+            response = self._send(entry.url, entry.payload.encode("utf-8"), entry.timeout)
+        except Exception as e:
+            self._retry(entry, retry_delay(entry.attempts + 1), f"{label} error: {e}")
+            return
+        finally:
+            self._last_io = time.monotonic()
+        send_end = self._last_io
+
+        status = response.status_code
+        if status == 429:
+            with self._stats_lock:
+                self.stats.rate_limited += 1
+            delay = rate_limit_delay(response)
+            if delay is None:
+                delay = retry_delay(entry.attempts + 1)
+            self._retry(entry, delay, f"{label} rate limited (429)")
+            return
+        if status >= 500:
+            self._retry(entry, retry_delay(entry.attempts + 1), f"{label} HTTP {status}")
+            return
+
+        self._outbox.remove(entry)
+        self._report(entry, status < 400, send_end)
+        if status >= 400:
+            with self._stats_lock:
+                self.stats.failed += 1
+                self._destination_stats(entry).errors += 1
+            logger.error("Error sending webhook: %s HTTP %s, giving up.", label, status)
+            return
+
+        http_seconds = send_end - send_start
+        latency = time.time() - entry.created_at
+        with self._stats_lock:
+            self.stats.sent += 1
+            self.stats.total_latency += latency
+            self.stats.last_latency = latency
+            dest = self._destination_stats(entry)
+            dest.sent += 1
+            dest.total_seconds += http_seconds
+            dest.last_seconds = http_seconds
+        logger.info(
+            "Notification sent to %s. HTTP took %.3fs (%.3fs after enqueue, attempt %d)",
+            label,
+            http_seconds,
+            latency,
+            entry.attempts + 1,
+        )
+
+    def _report(self, entry: OutboxEntry, ok: bool, completed_at: float) -> None:
+        if self._on_result is None:
+            return
+        try:
+            self._on_result(entry, ok, completed_at)
+        except Exception as e:
+            logger.debug("Notification result callback failed: %s", e)
+
+    def _retry(self, entry: OutboxEntry, delay: float, reason: str) -> None:
+        with self._stats_lock:
+            self.stats.retries += 1
+            self._destination_stats(entry).errors += 1
+        self._outbox.reschedule(entry, delay)
+        logger.warning("Error sending webhook: %s; retrying in %.1fs.", reason, delay)
+
+    def _warm(self) -> None:
+        # Runs on the pool so a slow warm-up never delays a real send.
+        self._last_io = time.monotonic()
+        if self._keep_warm is None or self._executor is None:
+            return
+        self._executor.submit(self._run_keep_warm)
+
+    def _run_keep_warm(self) -> None:
+        try:
+            self._keep_warm()
+        except Exception as e:
+            # Not fatal: the next send just pays for a fresh connection.
+            logger.debug("Keep-warm failed: %s", e)
+
+
+class Notifier:
+    """
+    Notification service shared by the watcher and the UI.
+    - Owns the webhook clients (all on one pooled keep-alive session), the
+      payload templates, the throttles and the durable dispatcher.
+    - `configure()` sets the destinations; payloads are built there once,
+      not per event.
+    - `notify_popup()` and `send_test()` return immediately; delivery runs on
+      background threads. Both go through the same pooled session, so a Test
+      Connection click also opens the connection the watcher uses later.
+    - Keep-warm requests only run between `set_keep_warm(True)` and
+      `set_keep_warm(False)` (i.e. while watching).
+    """
+
+    def __init__(
+        self,
+        outbox_path: Path,
+        throttle_seconds: float = THROTTLE_SECONDS,
+    ) -> None:
+        self._throttle_seconds = throttle_seconds
+        self._lock = threading.Lock()
+        self._destinations: List[Destination] = []
+        self._clients: Dict[str, WebhookClient] = {}
+        self._popup_messages: List[Tuple[Destination, bytes]] = []
+        self._test_payload = b""
+        self._last_sent: Dict[str, float] = {}  # throttle key -> time.monotonic()
+        self._result_listener: Optional[
+            Callable[[str, str, bool, int, float], None]
+        ] = None
+        self._dispatcher = NotificationDispatcher(
+            self._send,
+            NotificationOutbox(outbox_path),
+            keep_warm=self._warm_connections,
+            keep_warm_seconds=KEEP_WARM_SECONDS,
+            on_result=self._on_result,
+        )
+        self._dispatcher.set_keep_warm(False)
+
+    @property
+    def stats(self) -> DispatchStats:
+        return self._dispatcher.stats
+
+    @property
+    def destination_names(self) -> List[str]:
+        with self._lock:
+            return [d.name for d in self._destinations]
+
+    def set_result_listener(
+        self,
+        listener: Optional[Callable[[str, str, bool, int, float], None]],
+    ) -> None:
+        # listener(event_id, destination, ok, attempts, completed_at) runs on a
+        # notifier thread for every popup entry sent or given up on.
+        with self._lock:
+            self._result_listener = listener
+
+    def clear_result_listener(
+        self,
+        listener: Callable[[str, str, bool, int, float], None],
+    ) -> None:
+        # Unset `listener` only if it is still the current one, so a watcher
+        # shutting down can't unhook the watcher that replaced it.
+        with self._lock:
+            if self._result_listener == listener:
+                self._result_listener = None
+
+    def configure(
+        self,
+        webhook_url: str,
+        user_id: str,
+        extra: Sequence[Destination] = (),
+    ) -> None:
+        # The main webhook mentions `user_id`; `extra` comes from
+        # `notify_destinations`.
+        primary = Destination(
+            name="discord", url=webhook_url.strip(), user_id=user_id.strip()
+        )
+        destinations = [primary] + [d for d in extra if d.url]
+        with self._lock:
+            # Keep existing clients (and their warm connections) where possible.
+            self._destinations = destinations
+            self._clients = {
+                d.url: self._clients.get(d.url) or WebhookClient(d.url, d.timeout)
+                for d in destinations
+            }
+            self._popup_messages = [
+                (d, build_payload(d, POPUP_MESSAGE)) for d in destinations
+            ]
+            self._test_payload = build_payload(primary, TEST_MESSAGE)
+
+    def start(self) -> None:
+        self._dispatcher.start()
+
+    def close(self, timeout: float = 10.0) -> None:
+        self._dispatcher.close(timeout)
+
+    def set_keep_warm(self, enabled: bool) -> None:
+        self._dispatcher.set_keep_warm(enabled)
+
+    def notify_popup(self, event_id: str = "") -> Tuple[bool, int]:
+        # Queue the popup message for every destination. Returns (queued,
+        # seconds left on the throttle when not queued).
+        throttled, remaining = self._check_throttle("popup")
+        if throttled:
+            return False, remaining
+        with self._lock:
+            messages = list(self._popup_messages)
+        self._dispatcher.submit(messages, event_id)
+        return True, 0
+
+    def send_test(
+        self,
+        on_done: Callable[[Optional[Exception]], None],
+        webhook_url: Optional[str] = None,
+        user_id: str = "",
+    ) -> Tuple[bool, int]:
+        # Post the test message on a background thread; `on_done(error)` runs
+        # there with None on success. Goes to the main webhook, or to
+        # `webhook_url`/`user_id` when given (e.g. unsaved UI values) without
+        # reconfiguring anything. Returns like `notify_popup()`.
+        throttled, remaining = self._check_throttle("test")
+        if throttled:
+            return False, remaining
+        if webhook_url is not None:
+            primary: Optional[Destination] = Destination(
+                name="test", url=webhook_url.strip(), user_id=user_id.strip()
+            )
+            payload = build_payload(primary, TEST_MESSAGE)
+        else:
+            with self._lock:
+                primary = self._destinations[0] if self._destinations else None
+                payload = self._test_payload
+
+        def worker() -> None:
+            try:
+                if primary is None:
+                    raise ValueError("No webhook configured.")
+                self._send(primary.url, payload, primary.timeout).raise_for_status()
+            except Exception as e:
+                # Let the user retry right away after a failed test.
+                self._last_sent.pop("test", None)
+                on_done(e)
+                return
+            on_done(None)
+
+        threading.Thread(target=worker, name="qpopcv-test", daemon=True).start()
+        return True, 0
+
+    def _check_throttle(self, key: str) -> Tuple[bool, int]:
+        now = time.monotonic()
+        with self._lock:
+            elapsed = now - self._last_sent.get(key, float("-inf"))
+            if elapsed < self._throttle_seconds:
+                return True, int(self._throttle_seconds - elapsed)
+            self._last_sent[key] = now
+        return False, 0
+
+    def _send(self, url: str, payload: bytes, timeout: float) -> requests.Response:
+        # Outbox entries from a previous run may target a URL no longer configured.
+        with self._lock:
+            client = self._clients.get(url)
+        if client is None:
+            client = WebhookClient(url)
+        return client.post(payload, timeout=timeout)
+
+    def _on_result(self, entry: OutboxEntry, ok: bool, completed_at: float) -> None:
+        listener = self._result_listener
+        if listener is not None and entry.event_id:
+            listener(entry.event_id, entry.name, ok, entry.attempts + 1, completed_at)
+
+    def _warm_connections(self) -> None:
+        with self._lock:
+            clients = list(self._clients.values())
+        for client in clients:
+            try:
+                client.warm()
+            except Exception as e:
+                logger.debug("Keep-warm for %s failed: %s", client.url, e)
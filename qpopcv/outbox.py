@@ -0,0 +1,161 @@
+# On-disk outbox for webhook notifications.
+# Every detection event is written here before it is sent and removed only
+# once delivery succeeds (or is hopeless), so pending pops survive failed
+# requests, rate limits and app restarts.
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Collection, List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Exponential backoff between failed attempts: 1s, 2s, 4s, ... capped at 60s.
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+# A queue pop older than this is no longer worth delivering.
+OUTBOX_MAX_AGE_SECONDS = 300.0
+
+
+@dataclass
+class OutboxEntry:
+    id: str
+    url: str
+    payload: str  # JSON request body
+    created_at: float  # time.time(); wall clock so it means something after a restart
+    attempts: int = 0
+    next_attempt_at: float = 0.0  # time.time()
+    name: str = ""  # destination name, for stats and messages
+    timeout: float = 5.0  # per-request timeout for this destination
+    event_id: str = ""  # detection event, for latency records
+
+
+def retry_delay(attempts: int) -> float:
+    # Backoff after `attempts` failed tries (attempts >= 1).
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+
+
+class NotificationOutbox:
+    """
+    Durable FIFO of pending webhook requests.
+    - Backed by one JSON file, rewritten atomically (temp file + rename) on
+      every change; volumes are a handful of entries at most.
+    - Entries older than `max_age` are dropped instead of being sent late.
+    - Thread-safe; the dispatcher worker and the watcher may both use it.
+    """
+
+    def __init__(self, path: Path, max_age: float = OUTBOX_MAX_AGE_SECONDS) -> None:
+        self._path = path
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._entries: List[OutboxEntry] = self._load()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def add(
+        self,
+        url: str,
+        payload: bytes,
+        name: str = "",
+        timeout: float = 5.0,
+        event_id: str = "",
+    ) -> OutboxEntry:
+        return self.add_all([(url, payload, name, timeout)], event_id)[0]
+
+    def add_all(
+        self,
+        items: Sequence[Tuple[str, bytes, str, float]],
+        event_id: str = "",
+    ) -> List[OutboxEntry]:
+        # (url, payload, name, timeout) per entry, e.g. every destination of
+        # one event; the file is rewritten once for all of them.
+        now = time.time()
+        entries = [
+            OutboxEntry(
+                id=uuid.uuid4().hex,
+                url=url,
+                payload=payload.decode("utf-8"),
+                created_at=now,
+                next_attempt_at=now,
+                name=name,
+                timeout=timeout,
+                event_id=event_id,
+            )
+            for url, payload, name, timeout in items
+        ]
+        with self._lock:
+            self._entries.extend(entries)
+            self._save()
+        return entries
+
+    def due(self, exclude: Collection[str] = ()) -> List[OutboxEntry]:
+        # Entries ready to be attempted now, oldest first, skipping ids in
+        # `exclude` (e.g. requests already in flight). Expired ones go.
+        now = time.time()
+        with self._lock:
+            fresh = [e for e in self._entries if now - e.created_at <= self._max_age]
+            if len(fresh) != len(self._entries):
+                logger.warning(
+                    "Dropping %d expired notification(s) from the outbox.",
+                    len(self._entries) - len(fresh),
+                )
+                self._entries = fresh
+                self._save()
+            return [
+                e
+                for e in self._entries
+                if e.next_attempt_at <= now and e.id not in exclude
+            ]
+
+    def seconds_until_due(self, exclude: Collection[str] = ()) -> Optional[float]:
+        # None when nothing (outside `exclude`) is pending, else how long
+        # until the next entry is due (>= 0).
+        with self._lock:
+            waiting = [e.next_attempt_at for e in self._entries if e.id not in exclude]
+            if not waiting:
+                return None
+            next_at = min(waiting)
+        return max(0.0, next_at - time.time())
+
+    def remove(self, entry: OutboxEntry) -> None:
+        with self._lock:
+            self._entries = [e for e in self._entries if e.id != entry.id]
+            self._save()
+
+    def reschedule(self, entry: OutboxEntry, delay: float) -> None:
+        with self._lock:
+            entry.attempts += 1
+            entry.next_attempt_at = time.time() + delay
+            self._save()
+
+    def _load(self) -> List[OutboxEntry]:
+        if not self._path.exists():
+            return []
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+            entries = [OutboxEntry(**item) for item in data]
+        except Exception as exc:
+            logger.warning("Ignoring unreadable outbox %s: %s", self._path, exc)
+            return []
+        if entries:
+            logger.info("Outbox: %d pending notification(s) from a previous run.", len(entries))
+        return entries
+
+    def _save(self) -> None:
+        # Called with the lock held.
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        try:
+            tmp.write_text(
+                json.dumps([asdict(e) for e in self._entries], indent=2),
+                encoding="utf-8",
+            )
+            os.replace(tmp, self._path)
+        except OSError as exc:
+            logger.warning("Could not write outbox %s: %s", self._path, exc)
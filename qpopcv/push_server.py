@@ -0,0 +1,215 @@
+# Optional LAN push channel for detection events.
+# A tiny Server-Sent Events server: a phone browser (or any HTTP client) on
+# the same network subscribes to /events and gets each pop within
+# milliseconds, without going through Discord.
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Comment lines sent on idle streams so routers and browsers keep them open.
+KEEPALIVE_SECONDS = 15.0
+
+# How long a browser waits before reconnecting a dropped stream (ms).
+RECONNECT_MS = 1000
+
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>QPopCV</title>
+<style>
+body { font-family: sans-serif; text-align: center; margin-top: 30vh; }
+#status { font-size: 2em; }
+</style></head>
+<body><div id="status">Waiting for queue...</div><div id="detail"></div>
+<script>
+const status = document.getElementById("status");
+const detail = document.getElementById("detail");
+const source = new EventSource("/events");
+source.onopen = () => { detail.textContent = "connected"; };
+source.onerror = () => { detail.textContent = "reconnecting..."; };
+source.addEventListener("queue_pop", (e) => {
+  const data = JSON.parse(e.data);
+  status.textContent = "Queue popped!";
+  document.title = "POP! QPopCV";
+  detail.textContent = new Date(data.sent_at * 1000).toLocaleTimeString();
+  if (navigator.vibrate) navigator.vibrate([300, 100, 300]);
+});
+</script></body></html>
+"""
+
+
+@dataclass
+class PushStats:
+    events: int = 0
+    deliveries: int = 0  # event x subscriber writes that succeeded
+    total_write_seconds: float = 0.0  # publish -> flushed, summed
+    max_write_seconds: float = 0.0
+
+    @property
+    def average_write_seconds(self) -> float:
+        return self.total_write_seconds / self.deliveries if self.deliveries else 0.0
+
+
+class _Subscriber:
+    def __init__(self) -> None:
+        # (event name, JSON data, publish time.monotonic()); None = close.
+        self.queue: "queue.Queue[Optional[Tuple[str, str, float]]]" = queue.Queue()
+
+
+class PushServer:
+    """
+    Server-Sent Events endpoint for detection events.
+    - GET /events streams `event: <name>` / `data: <json>` messages; every
+      `publish()` is written to all subscribers right away (one thread per
+      subscriber, TCP_NODELAY, flushed per event).
+    - GET / serves a minimal page that subscribes and vibrates on a pop.
+    - Idle streams get a keep-alive comment every KEEPALIVE_SECONDS.
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 8765) -> None:
+        self._host = host
+        self._port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._subscribers: List[_Subscriber] = []
+        self.stats = PushStats()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        # Bound (host, port); the port is real once started (port 0 = any).
+        if self._server is not None:
+            host, port = self._server.server_address[:2]
+            return host, port
+        return self._host, self._port
+
+    @property
+    def subscribers(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def start(self) -> None:
+        if self._server is not None:
+            return
+        server = ThreadingHTTPServer((self._host, self._port), self._handler_class())
+        server.daemon_threads = True
+        self._server = server
+        self._thread = threading.Thread(
+            target=server.serve_forever, name="qpopcv-push", daemon=True
+        )
+        self._thread.start()
+
+    def publish(self, event: str, data: Dict[str, object]) -> int:
+        # Queue `data` for every subscriber; returns how many there are.
+        payload = json.dumps(data)
+        published_at = time.monotonic()
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.stats.events += 1
+        for subscriber in subscribers:
+            subscriber.queue.put((event, payload, published_at))
+        return len(subscribers)
+
+    def close(self) -> None:
+        server, self._server = self._server, None
+        if server is None:
+            return
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscriber in subscribers:
+            subscriber.queue.put(None)
+        server.shutdown()
+        server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    # --------- Internal Helpers ---------
+
+    def _add(self) -> _Subscriber:
+        subscriber = _Subscriber()
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def _remove(self, subscriber: _Subscriber) -> None:
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def _delivered(self, published_at: float) -> None:
+        elapsed = time.monotonic() - published_at
+        with self._lock:
+            self.stats.deliveries += 1
+            self.stats.total_write_seconds += elapsed
+            self.stats.max_write_seconds = max(self.stats.max_write_seconds, elapsed)
+
+    def _handler_class(self) -> type:
+        push = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                # Small event frames must not wait for Nagle's algorithm.
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self) -> None:
+                path = self.path.split("?", 1)[0]
+                if path == "/events":
+                    self._stream()
+                elif path == "/":
+                    body = PAGE.encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                else:
+                    self.send_error(404)
+
+            def _stream(self) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.close_connection = True
+
+                subscriber = push._add()
+                try:
+                    self.wfile.write(f"retry: {RECONNECT_MS}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    while True:
+                        try:
+                            item = subscriber.queue.get(timeout=KEEPALIVE_SECONDS)
+                        except queue.Empty:
+                            self.wfile.write(b": keep-alive\n\n")
+                            self.wfile.flush()
+                            continue
+                        if item is None:
+                            break
+                        event, payload, published_at = item
+                        self.wfile.write(
+                            f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+                        )
+                        self.wfile.flush()
+                        push._delivered(published_at)
+                except OSError:
+                    pass  # subscriber went away
+                finally:
+                    push._remove(subscriber)
+
+            def log_message(self, format: str, *args: object) -> None:
+                logger.debug("Push %s: %s", self.address_string(), format % args)
+
+        return Handler
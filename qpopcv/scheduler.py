@@ -0,0 +1,107 @@
+# Fixed-rate tick scheduler for the watcher loops.
+# Ticks on monotonic deadlines (start + k * interval) instead of sleeping a
+# full interval after the work, so the period doesn't stretch with capture
+# and match time. Missed deadlines are skipped, never queued.
+from dataclasses import dataclass
+from typing import Optional
+import threading
+import time
+
+
+@dataclass
+class SchedulerStats:
+    ticks: int = 0
+    missed: int = 0
+    jitter_total: float = 0.0  # seconds late, summed over ticks
+    jitter_max: float = 0.0
+    started_at: Optional[float] = None
+    last_tick_at: Optional[float] = None
+
+    @property
+    def mean_jitter(self) -> float:
+        return self.jitter_total / self.ticks if self.ticks else 0.0
+
+    @property
+    def achieved_rate(self) -> float:
+        # Ticks per second since the first tick.
+        if self.started_at is None or self.last_tick_at is None:
+            return 0.0
+        elapsed = self.last_tick_at - self.started_at
+        return self.ticks / elapsed if elapsed > 0 else 0.0
+
+
+class DeadlineScheduler:
+    """
+    Sleeps until the next fixed deadline.
+    - Deadlines sit on a grid of `interval` seconds from the first `wait()`.
+    - If the work overran one or more deadlines, they are counted as missed
+      and the loop resumes on the next future grid point.
+    - Once `stop_event` is set, `wait()` returns True; call `wake()` after
+      setting it to cut a long sleep short.
+    - `set_interval()` may be called from another thread; it wakes a
+      sleeping `wait()` so a shorter interval applies right away.
+    """
+
+    def __init__(self, interval: float, stop_event: threading.Event) -> None:
+        self._interval = max(0.001, float(interval))
+        self._stop_event = stop_event
+        self._next: Optional[float] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.stats = SchedulerStats()
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def reset(self) -> None:
+        # Start a fresh grid from the next wait (e.g. after an error pause).
+        with self._lock:
+            self._next = None
+
+    def set_interval(self, interval: float) -> None:
+        # Rebase the grid on the new interval; never push the next tick later.
+        interval = max(0.001, float(interval))
+        with self._lock:
+            if interval == self._interval:
+                return
+            self._interval = interval
+            if self._next is not None:
+                self._next = min(self._next, time.monotonic() + interval)
+        self._wake.set()
+
+    def wake(self) -> None:
+        # Interrupt a sleeping `wait()`, e.g. right after setting `stop_event`.
+        self._wake.set()
+
+    def wait(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self._next is None:
+                self._next = now + self._interval
+                if self.stats.started_at is None:
+                    self.stats.started_at = now
+
+            if now > self._next:
+                skipped = int((now - self._next) // self._interval) + 1
+                self.stats.missed += skipped
+                self._next += skipped * self._interval
+
+        while not self._stop_event.is_set():
+            remaining = self._next - time.monotonic()
+            if remaining <= 0:
+                break
+            if self._wake.wait(remaining):
+                self._wake.clear()
+        if self._stop_event.is_set():
+            return True
+
+        with self._lock:
+            woke = time.monotonic()
+            late = max(0.0, woke - self._next)
+            self.stats.ticks += 1
+            self.stats.jitter_total += late
+            self.stats.jitter_max = max(self.stats.jitter_max, late)
+            self.stats.last_tick_at = woke
+            self._next += self._interval
+        return False
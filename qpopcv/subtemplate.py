@@ -0,0 +1,154 @@
+# Discriminative sub-template selection for user reference images.
+# Finds the smallest patch of the reference that still tells the popup apart
+# from the rest of the capture region, and caches the choice in a JSON file in
+# the app folder so the analysis runs only once per reference, confidence and
+# frame format.
+from pathlib import Path
+from typing import Optional, Tuple
+import json
+import logging
+
+import cv2
+import numpy as np
+
+from .capture import FrameFormat
+from .matcher import MATCH_METHOD
+
+logger = logging.getLogger(__name__)
+
+# Patch sizes to try, as a fraction of each reference dimension (smallest first).
+PATCH_FRACTIONS = (0.25, 0.35, 0.5)
+
+# A patch must score at least this far below `confidence` everywhere it
+# should NOT match (background frame, other spots in the reference).
+DISCRIMINATION_MARGIN = 0.15
+
+# Flat patches (std below this, in gray levels) never discriminate well.
+MIN_PATCH_STD = 10.0
+
+MIN_PATCH_SIZE = 12
+
+# Relative patch rect: (x, y, w, h) as fractions of the reference size.
+RelRect = Tuple[float, float, float, float]
+
+
+def _best_elsewhere(scores: np.ndarray, x: int, y: int, w: int, h: int) -> float:
+    # Highest score outside a +-(w, h) neighbourhood of (x, y).
+    masked = scores.copy()
+    masked[max(0, y - h) : y + h + 1, max(0, x - w) : x + w + 1] = -1.0
+    return float(masked.max()) if masked.size else -1.0
+
+
+def find_discriminative_patch(
+    reference: np.ndarray,
+    background: np.ndarray,
+    confidence: float,
+) -> Optional[RelRect]:
+    """
+    Pick the smallest patch of `reference` (uint8 gray) that stays below
+    `confidence - DISCRIMINATION_MARGIN` on every background position and on
+    every other spot of the reference itself.
+
+    `background` is a gray capture of the watch region without the popup.
+    Returns a relative rect, or None if no patch is distinctive enough.
+    """
+    ref_h, ref_w = reference.shape[:2]
+    limit = confidence - DISCRIMINATION_MARGIN
+
+    for fraction in PATCH_FRACTIONS:
+        patch_w = int(round(ref_w * fraction))
+        patch_h = int(round(ref_h * fraction))
+        if min(patch_w, patch_h) < MIN_PATCH_SIZE:
+            continue
+        if patch_w > background.shape[1] or patch_h > background.shape[0]:
+            continue
+
+        stride_x = max(1, patch_w // 2)
+        stride_y = max(1, patch_h // 2)
+        best: Optional[Tuple[float, RelRect]] = None
+
+        for y in range(0, ref_h - patch_h + 1, stride_y):
+            for x in range(0, ref_w - patch_w + 1, stride_x):
+                patch = np.ascontiguousarray(reference[y : y + patch_h, x : x + patch_w])
+                if float(patch.std()) < MIN_PATCH_STD:
+                    continue
+
+                self_scores = cv2.matchTemplate(reference, patch, MATCH_METHOD)
+                worst = _best_elsewhere(self_scores, x, y, patch_w // 2, patch_h // 2)
+                if worst >= limit:
+                    continue
+
+                bg_scores = cv2.matchTemplate(background, patch, MATCH_METHOD)
+                worst = max(worst, float(bg_scores.max()))
+                if worst >= limit:
+                    continue
+
+                margin = limit - worst
+                if best is None or margin > best[0]:
+                    best = (
+                        margin,
+                        (x / ref_w, y / ref_h, patch_w / ref_w, patch_h / ref_h),
+                    )
+
+        if best is not None:
+            return best[1]
+
+    return None
+
+
+def _fingerprint(reference_path: Path) -> dict:
+    stat = reference_path.stat()
+    return {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+
+def _cache_key(reference_path: Path, confidence: float, fmt: FrameFormat) -> dict:
+    # Everything the choice depends on: the reference file, `confidence`
+    # (it sets the limit) and the frame format the patch was scored in.
+    return {
+        "reference": _fingerprint(reference_path),
+        "confidence": float(confidence),
+        "format": {"color": fmt.color, "scale": float(fmt.scale)},
+    }
+
+
+def _read_cache(cache_path: Path) -> dict:
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_cached_patch(
+    cache_path: Path, reference_path: Path, confidence: float, fmt: FrameFormat
+) -> Optional[RelRect]:
+    # Return the cached patch for this reference if it was chosen under the
+    # same key; any mismatch means the analysis has to run again.
+    entry = _read_cache(cache_path).get(str(reference_path.resolve()))
+    try:
+        if not isinstance(entry, dict) or entry.get("key") != _cache_key(
+            reference_path, confidence, fmt
+        ):
+            return None
+        x, y, w, h = (float(v) for v in entry["patch"])
+        return x, y, w, h
+    except Exception:
+        return None
+
+
+def save_cached_patch(
+    cache_path: Path,
+    reference_path: Path,
+    patch: RelRect,
+    confidence: float,
+    fmt: FrameFormat,
+) -> None:
+    data = _read_cache(cache_path)
+    data[str(reference_path.resolve())] = {
+        "key": _cache_key(reference_path, confidence, fmt),
+        "patch": list(patch),
+    }
+    try:
+        cache_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    except OSError as exc:
+        logger.warning("Could not cache sub-template at %s: %s", cache_path, exc)
@@ -3,15 +3,73 @@ from typing import Dict, Optional, Tuple, Callable, List
 import threading
 import time
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import logging
 
+import numpy as np
 import pyautogui
-from pyautogui import ImageNotFoundException
-import requests
 from PIL import Image
 
-THROTTLE_SECONDS = 15
+from .async_log import RateLimitedLog
+from .calibration import COARSE_SCALES, calibrate_scale, search_scale
+from .capture import (
+    FRAME_COLORS,
+    CaptureStats,
+    FrameFormat,
+    FrameMailbox,
+    create_frame_source,
+    reduce_pixels,
+)
+from .change_gate import FrameChangeGate, GateStats
+from .config import OUTBOX_PATH, SUBTEMPLATE_CACHE_PATH
+from .notifier import (
+    Destination,
+    DispatchStats,
+    Notifier,
+    parse_destinations,
+)
+from .latency import LatencyTracker
+from .push_server import PushServer
+from .scheduler import DeadlineScheduler, SchedulerStats
+from .subtemplate import (
+    find_discriminative_patch,
+    load_cached_patch,
+    save_cached_patch,
+)
+from .matcher import (
+    MATCH_MODES,
+    FFTMatcher,
+    MatchResult,
+    PyramidMatcher,
+    TemplateMatcher,
+    TiledMatcher,
+    crop_frame,
+    frame_size,
+    to_gray,
+)
+
+SCREEN_CHECK_SECONDS = 5.0
+
+# While uncalibrated, changed frames nothing matched get a whole-frame scale
+# search at most this often (finds UI scales the 0.9-1.1 variants miss).
+# One search costs roughly 0.1-0.4s on the matching thread.
+CALIBRATION_SEARCH_SECONDS = 30.0
+# A search hit must clear `confidence` by this much, then match again within
+# this many evaluated frames before it is reported or saved.
+CALIBRATION_SEARCH_MARGIN = 0.15
+CALIBRATION_CONFIRM_FRAMES = 3
+
+# A burst only re-arms while near-miss scores keep rising by this much, and
+# bursting stops BURST_MAX_SECONDS after the score entered the near band.
+BURST_MIN_RISE = 0.01
+BURST_MAX_SECONDS = 5.0
+
+# A failed probe still gets its anchor window scored (for burst mode) when
+# at least this share of `probe_min_ratio` matched: the popup may be forming.
+BURST_PROBE_FRACTION = 0.5
+
+# A loop that keeps failing logs the same error at most this often.
+ERROR_LOG_SECONDS = 60.0
 
 logger = logging.getLogger(__name__)
 
@@ -36,18 +94,92 @@ class WatcherSettings:
     check_interval: float = 0.5
     confidence: float = 0.6
     reference_image_path: Optional[Path] = None
+    pipeline: bool = True
+    capture_backend: str = "auto"
+    capture_ring_size: int = 3
+    frame_color: str = "gray"
+    frame_scale: float = 1.0
+    match_mode: str = "direct"
+    match_workers: int = 1
+    pyramid_scale: float = 0.25
+    pyramid_candidates: int = 3
+    tile_size: int = 64
+    tile_threshold: float = 8.0
+    lock_roi: bool = True
+    lock_padding: int = 16
+    lock_max_misses: int = 5
+    probe: bool = True
+    probe_tolerance: float = 24.0
+    probe_min_ratio: float = 0.8
+    probe_full_scan_every: int = 10
+    change_gate: bool = True
+    change_threshold: float = 8.0
+    burst_mode: bool = True
+    burst_interval: float = 0.02
+    burst_margin: float = 0.1
+    burst_seconds: float = 1.0
+    sub_template: bool = True
+    auto_calibrate: bool = True
+    calibrated_scale: float = 0.0
+    calibrated_screen: Optional[Tuple[int, int]] = None
+    calibrated_reference: str = ""
+    notify_destinations: List[Destination] = field(default_factory=list)
+    push_server: bool = False
+    push_host: str = "0.0.0.0"
+    push_port: int = 8765
+    latency_log: Optional[Path] = None
 
     @classmethod
     def from_config(cls, config: Dict[str, object]) -> "WatcherSettings":
         ref_path_str = str(config.get("reference_image_path", "")).strip()
         ref_path = Path(ref_path_str).expanduser() if ref_path_str else None
 
+        latency_str = str(config.get("latency_log", "")).strip()
+        latency_log = Path(latency_str).expanduser() if latency_str else None
+
+        screen = config.get("calibrated_screen") or None
+        calibrated_screen = (int(screen[0]), int(screen[1])) if screen else None
+
         return cls(
             webhook_url=str(config.get("webhook_url", "")).strip(),
             user_id=str(config.get("user_id", "")).strip(),
             check_interval=float(config.get("check_interval", 0.5)),
             confidence=float(config.get("confidence", 0.6)),
             reference_image_path=ref_path,
+            pipeline=bool(config.get("pipeline", True)),
+            capture_backend=str(config.get("capture_backend", "auto")).strip().lower(),
+            capture_ring_size=int(config.get("capture_ring_size", 3)),
+            frame_color=str(config.get("frame_color", "gray")).strip().lower(),
+            frame_scale=float(config.get("frame_scale", 1.0)),
+            match_mode=str(config.get("match_mode", "direct")).strip().lower(),
+            match_workers=int(config.get("match_workers", 1)),
+            pyramid_scale=float(config.get("pyramid_scale", 0.25)),
+            pyramid_candidates=int(config.get("pyramid_candidates", 3)),
+            tile_size=int(config.get("tile_size", 64)),
+            tile_threshold=float(config.get("tile_threshold", 8.0)),
+            lock_roi=bool(config.get("lock_roi", True)),
+            lock_padding=int(config.get("lock_padding", 16)),
+            lock_max_misses=int(config.get("lock_max_misses", 5)),
+            probe=bool(config.get("probe", True)),
+            probe_tolerance=float(config.get("probe_tolerance", 24.0)),
+            probe_min_ratio=float(config.get("probe_min_ratio", 0.8)),
+            probe_full_scan_every=int(config.get("probe_full_scan_every", 10)),
+            change_gate=bool(config.get("change_gate", True)),
+            change_threshold=float(config.get("change_threshold", 8.0)),
+            burst_mode=bool(config.get("burst_mode", True)),
+            burst_interval=float(config.get("burst_interval", 0.02)),
+            burst_margin=float(config.get("burst_margin", 0.1)),
+            burst_seconds=float(config.get("burst_seconds", 1.0)),
+            sub_template=bool(config.get("sub_template", True)),
+            auto_calibrate=bool(config.get("auto_calibrate", True)),
+            calibrated_scale=float(config.get("calibrated_scale", 0.0)),
+            calibrated_screen=calibrated_screen,
+            calibrated_reference=str(config.get("calibrated_reference", "")).strip(),
+            notify_destinations=parse_destinations(config.get("notify_destinations")),
+            push_server=bool(config.get("push_server", False)),
+            push_host=str(config.get("push_host", "0.0.0.0")).strip(),
+            push_port=int(config.get("push_port", 8765)),
+            latency_log=latency_log,
         )
 
 
@@ -63,29 +195,114 @@ class QPopWatcher:
     - If provided and valid, uses that as the primary reference (with small
       multi-scale variants around 100%).
     - If not provided, falls back to built-in reference images.
+    - The user's UI scale is calibrated once, on the first detection or by a
+      rate-limited whole-frame search while nothing matches; afterwards only
+      that single scale is matched until the screen size changes.
     """
 
     def __init__(
         self,
         settings: WatcherSettings,
         on_detect: Optional[Callable[[], None]] = None,
+        on_calibrated: Optional[Callable[[float, Tuple[int, int]], None]] = None,
+        notifier: Optional[Notifier] = None,
     ) -> None:
         self._webhook_url = settings.webhook_url.strip()
         self._user_id = settings.user_id.strip()
         self._check_interval = float(settings.check_interval)
         self._confidence = float(settings.confidence)
         self._reference_path = settings.reference_image_path
+        self._settings = settings
 
-        self._mention = f"<@{self._user_id}>"
         self._on_detect = on_detect
+        self._on_calibrated = on_calibrated
 
         self._thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
-        self._last_qpop_time: float = 0.0
+        self._error_log = RateLimitedLog(logger, ERROR_LOG_SECONDS)
         self._seen_once: bool = False
 
+        # Notifications go through the app-wide notifier when given (shared
+        # with Test Connection), else through one owned by this watcher.
+        # Sends run on its workers, never in this loop.
+        self._owns_notifier = notifier is None
+        self._notifier = notifier if notifier is not None else Notifier(OUTBOX_PATH)
+        self._notifier.configure(
+            self._webhook_url, self._user_id, settings.notify_destinations
+        )
+
+        # Per-detection stage timings, emitted via logging (+ optional JSONL).
+        self._latency = LatencyTracker(settings.latency_log)
+
+        # Optional LAN push channel (SSE); pops reach subscribers directly.
+        self._push: Optional[PushServer] = (
+            PushServer(settings.push_host, settings.push_port)
+            if settings.push_server
+            else None
+        )
+
+        # Locked-ROI tracking: last match and consecutive misses at its spot.
+        self._lock: Optional[MatchResult] = None
+        self._lock_misses: int = 0
+
+        # Sparse probe: where the popup was last found, whether the probe has
+        # failed there since the last full scan, and when that scan ran.
+        self._anchor: Optional[MatchResult] = None
+        self._probe_missed: bool = False
+        self._last_full_scan: float = 0.0
+
+        # Skip matching on frames that barely changed since the last match.
+        self._gate: Optional[FrameChangeGate] = (
+            FrameChangeGate(settings.change_threshold) if settings.change_gate else None
+        )
+        self._last_match: Optional[MatchResult] = None
+
         self._region = self._compute_top_center_region()
+        self._frame_format = self._create_frame_format()
+        self._source = create_frame_source(
+            settings.capture_backend,
+            self._region,
+            settings.capture_ring_size,
+            self._frame_format,
+        )
+        self._screen_size: Tuple[int, int] = tuple(pyautogui.size())
+        self._last_screen_check: float = time.monotonic()
+
+        # Pipeline mode: capture thread -> mailbox -> matching (watcher) thread.
+        self._mailbox = FrameMailbox()
+        self._screen_changed = threading.Event()
+
+        # Fixed-rate ticks for whichever loop captures frames. `check_interval`
+        # is the idle rate; rising near-miss scores switch to `burst_interval`
+        # until `_burst_until`.
+        self._scheduler = DeadlineScheduler(self._check_interval, self._stop_event)
+        self._burst_until: float = 0.0
+        self._burst_started: float = 0.0  # when the score entered the band
+        self._burst_score: Optional[float] = None  # best near score so far
+        self._bursts: int = 0
+
+        # A stored calibration only applies to the same reference and screen.
+        self._calibrated_scale: float = 0.0
+        if (
+            settings.calibrated_scale > 0
+            and settings.calibrated_screen == self._screen_size
+            and settings.calibrated_reference == str(self._reference_path or "")
+        ):
+            self._calibrated_scale = settings.calibrated_scale
+        # Whole-frame search bookkeeping: last run, and whether a changed
+        # frame has been seen since.
+        self._last_scale_search: float = float("-inf")
+        self._scale_search_stale: bool = True
+        # Evaluated frames left to confirm a scale the search found (0: none).
+        self._calibration_pending: int = 0
+
+        self._reference_base: Optional[Image.Image] = None
         self._reference_images = self._prepare_reference_images()
+        self._matcher = self._create_matcher()
+
+        # Discriminative sub-template (relative rect), chosen on the first frame.
+        self._patch: Optional[Tuple[float, float, float, float]] = None
+        self._patch_checked: bool = False
 
 
     # --------- Public API ---------
@@ -95,20 +312,64 @@ class QPopWatcher:
             return
 
         self._stop_event.clear()
+        if self._owns_notifier:
+            # A shared notifier is started and kept warm by its owner.
+            self._notifier.start()
+            self._notifier.set_keep_warm(True)
+        self._notifier.set_result_listener(self._latency.delivered)
+        if self._push is not None:
+            try:
+                self._push.start()
+                host, port = self._push.address
+                logger.info("LAN push server: http://%s:%s/", host, port)
+            except OSError as e:
+                logger.warning("Could not start LAN push server: %s", e)
+                self._push = None
         self._thread = threading.Thread(target=self._loop, daemon=True)
         self._thread.start()
 
         logger.info("QPopCV screen watcher started.")
         logger.info("Region (top-center): %s", self._region)
+        logger.info("Pipelined capture: %s", self._settings.pipeline)
+        logger.info(
+            "Capture backend: %s (%s, scale %s)",
+            self._source.name,
+            self._frame_format.color,
+            self._frame_format.scale,
+        )
         logger.info(
             "Interval: %ss, confidence: %s",
             self._check_interval,
             self._confidence,
         )
+        logger.info(
+            "Match mode: %s (%s worker(s))",
+            self._settings.match_mode,
+            self._settings.match_workers,
+        )
+        logger.info(
+            "Burst mode: %s (%ss for %ss when a score is within %s of confidence)",
+            self._settings.burst_mode,
+            self._settings.burst_interval,
+            self._settings.burst_seconds,
+            self._settings.burst_margin,
+        )
+        logger.info(
+            "Locked ROI: %s (padding %spx, max misses %s)",
+            self._settings.lock_roi,
+            self._settings.lock_padding,
+            self._settings.lock_max_misses,
+        )
         logger.info(
             "Reference image: %s",
             self._reference_path if self._reference_path else "built-in defaults",
         )
+        logger.info(
+            "UI scale: %s",
+            f"{self._calibrated_scale:.2f} (calibrated)"
+            if self._calibrated_scale > 0
+            else "not calibrated",
+        )
         if not self._reference_images:
             logger.warning(
                 "No reference images prepared. Detection will not work correctly."
@@ -117,6 +378,23 @@ class QPopWatcher:
 
     def stop(self) -> None:
         self._stop_event.set()
+        self._scheduler.wake()
+
+    @property
+    def capture_stats(self) -> CaptureStats:
+        return self._source.stats
+
+    @property
+    def notify_stats(self) -> DispatchStats:
+        return self._notifier.stats
+
+    @property
+    def scheduler_stats(self) -> SchedulerStats:
+        return self._scheduler.stats
+
+    @property
+    def gate_stats(self) -> Optional[GateStats]:
+        return self._gate.stats if self._gate is not None else None
 
     def is_running(self) -> bool:
         return self._thread is not None and self._thread.is_alive()
@@ -132,97 +410,598 @@ class QPopWatcher:
         region_h = screen_h // 2
         return region_x, region_y, region_w, region_h
 
-    def _find_queue_popup(self, screenshot) -> Optional[str]:
-        for name, reference in self._reference_images:
-            try:
-                loc = pyautogui.locate(
-                    reference,
-                    screenshot,
-                    confidence=self._confidence,
+    def _create_frame_format(self) -> FrameFormat:
+        color = self._settings.frame_color
+        if color not in FRAME_COLORS:
+            logger.warning("Unknown frame_color %r; using 'gray'.", color)
+            color = "gray"
+        scale = min(1.0, max(0.05, self._settings.frame_scale))
+        return FrameFormat(color=color, scale=scale)
+
+    def _to_working_format(self, image: Image.Image) -> np.ndarray:
+        # Reduce a reference exactly like captured frames are reduced.
+        return reduce_pixels(np.asarray(image.convert("RGB")), self._frame_format)
+
+    def _create_matcher(self) -> TemplateMatcher:
+        mode = self._settings.match_mode
+        workers = self._settings.match_workers
+        if mode not in MATCH_MODES:
+            logger.warning("Unknown match_mode %r; using 'direct'.", mode)
+            mode = "direct"
+
+        if mode == "pyramid":
+            return PyramidMatcher(
+                self._reference_images,
+                self._confidence,
+                scale=self._settings.pyramid_scale,
+                candidates=self._settings.pyramid_candidates,
+                workers=workers,
+            )
+        if mode == "fft":
+            return FFTMatcher(self._reference_images, self._confidence, workers=workers)
+        if mode == "tiled":
+            return TiledMatcher(
+                self._reference_images,
+                self._confidence,
+                tile_size=self._settings.tile_size,
+                pixel_threshold=self._settings.tile_threshold,
+                workers=workers,
+            )
+        return TemplateMatcher(self._reference_images, self._confidence, workers=workers)
+
+    def _find_queue_popup(self, frame) -> Optional[MatchResult]:
+        if self._lock is not None:
+            match = self._matcher.match_at(
+                frame, self._lock, self._settings.lock_padding
+            )
+            if match is not None:
+                self._lock = match
+                self._lock_misses = 0
+                return match
+
+            # Treat a miss at the locked spot as "no popup" until the lock
+            # runs out of misses, then fall back to scanning the full region.
+            self._lock_misses += 1
+            if self._lock_misses <= self._settings.lock_max_misses:
+                return None
+            self._lock = None
+
+        if self._anchor is not None and self._settings.probe:
+            probed = self._matcher.probe(
+                frame,
+                self._anchor,
+                self._settings.probe_tolerance,
+                self._settings.probe_min_ratio,
+            )
+            partial = (
+                self._settings.burst_mode
+                and self._matcher.last_probe_ratio
+                >= self._settings.probe_min_ratio * BURST_PROBE_FRACTION
+            )
+            if probed or partial:
+                # Confirm cheaply where it was before. A partial probe gets
+                # scored too: a fading-in popup scores near `confidence`
+                # before all its probe pixels match, and that starts a burst.
+                match = self._matcher.match_at(
+                    frame, self._anchor, self._settings.lock_padding
+                )
+                if match is not None:
+                    return self._remember_match(match)
+            if not probed and not self._full_scan_due():
+                # Still scan the full region now and then, in case the popup
+                # shows up somewhere else.
+                self._probe_missed = True
+                return None
+
+        self._probe_missed = False
+        self._last_full_scan = time.monotonic()
+        match = self._matcher.match(frame)
+        if match is None:
+            return None
+        return self._remember_match(match)
+
+    def _full_scan_due(self) -> bool:
+        # Every `probe_full_scan_every` idle ticks, by the clock: frames the
+        # gate skipped and burst ticks don't stretch or shrink the wait.
+        period = self._settings.probe_full_scan_every * self._check_interval
+        return time.monotonic() - self._last_full_scan >= period
+
+    def _search_pending(self) -> bool:
+        # A miss countdown is running (the locked spot missed and the lock
+        # hasn't run out, or the probe failed and a full scan is due): those
+        # frames have to be matched, or the fallback full scan never comes.
+        if self._lock is not None:
+            return self._lock_misses > 0
+        return self._probe_missed and self._full_scan_due()
+
+    def _update_rate(self, score: Optional[float]) -> None:
+        # Burst while scores climb just under `confidence` (e.g. a popup
+        # fading in); `score` is None on frames the gate skipped and -1.0
+        # when nothing was scored. A score that sits still in the band (a
+        # static look-alike) doesn't re-arm.
+        if not self._settings.burst_mode:
+            return
+
+        now = time.monotonic()
+        if score is not None and score >= 0.0:
+            near = (
+                self._confidence - self._settings.burst_margin
+                <= score
+                < self._confidence
+            )
+            if not near:
+                self._burst_score = None
+            elif (
+                self._burst_score is None
+                or score >= self._burst_score + BURST_MIN_RISE
+            ):
+                if self._burst_score is None:
+                    self._burst_started = now  # the score just entered the band
+                self._burst_score = score
+                until = min(
+                    now + self._settings.burst_seconds,
+                    self._burst_started + BURST_MAX_SECONDS,
                 )
-            except ImageNotFoundException:
-                loc = None
+                if until > now:
+                    if now >= self._burst_until:
+                        self._bursts += 1
+                        self._scheduler.set_interval(self._settings.burst_interval)
+                    self._burst_until = until
+        if now >= self._burst_until:
+            self._scheduler.set_interval(self._check_interval)
 
-            if loc is not None:
-                return name
+    def _remember_match(self, match: MatchResult) -> MatchResult:
+        self._anchor = match
+        self._probe_missed = False
+        if self._settings.lock_roi:
+            self._lock = match
+            self._lock_misses = 0
+        return match
 
-        return None
+    def _reset_matching(self) -> None:
+        # Rebuild the matcher from the current references and forget any
+        # state tied to the old templates or region.
+        self._matcher.close()
+        self._matcher = self._create_matcher()
+        self._matcher.set_patch(self._patch)
+        self._lock = None
+        self._lock_misses = 0
+        self._anchor = None
+        self._probe_missed = False
+        self._last_match = None
+        if self._gate is not None:
+            self._gate.reset()
 
-    def _send_discord_message(self, content: str) -> None:
-        requests.post(
-            self._webhook_url,
-            json={"content": content},
-            timeout=5,
+    def _prepare_patch(self, frame) -> None:
+        # Runs once, on the first frame, which doubles as the background the
+        # patch must NOT match. A popup already on screen just means no patch.
+        self._patch_checked = True
+        if (
+            not self._settings.sub_template
+            or self._reference_base is None
+            or self._reference_path is None
+        ):
+            return
+        if isinstance(self._matcher, (PyramidMatcher, FFTMatcher, TiledMatcher)):
+            # These engines score full templates only; a patch would go unused.
+            logger.info(
+                "Sub-template skipped: only used in 'direct' match mode (now %r).",
+                self._settings.match_mode,
+            )
+            return
+
+        patch = load_cached_patch(
+            SUBTEMPLATE_CACHE_PATH,
+            self._reference_path,
+            self._confidence,
+            self._frame_format,
         )
+        if patch is None:
+            started = time.perf_counter()
+            patch = find_discriminative_patch(
+                to_gray(self._to_working_format(self._reference_base)),
+                frame,
+                self._confidence,
+            )
+            elapsed = time.perf_counter() - started
+            if patch is None:
+                logger.info(
+                    "No discriminative sub-template found (%.3fs); "
+                    "matching full references.",
+                    elapsed,
+                )
+                return
+            save_cached_patch(
+                SUBTEMPLATE_CACHE_PATH,
+                self._reference_path,
+                patch,
+                self._confidence,
+                self._frame_format,
+            )
+            logger.info("Selected sub-template %s in %.3fs.", patch, elapsed)
 
-    def _check_throttle(self) -> Tuple[bool, int, float]:
-        now = time.time()
-        elapsed = now - self._last_qpop_time
-        if elapsed < THROTTLE_SECONDS:
-            remaining = int(THROTTLE_SECONDS - elapsed)
-            return True, remaining, now
-        return False, 0, now
+        self._patch = patch
+        self._matcher.set_patch(patch)
 
-    def _handle_detected_popup(self, match_name: str) -> None:
-        detected_at = time.time()
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(detected_at))
-        print(f"[{timestamp}] Queue popup detected via '{match_name}'")
+    def _needs_calibration(self) -> bool:
+        return (
+            self._settings.auto_calibrate
+            and self._calibrated_scale <= 0
+            and self._reference_base is not None
+        )
 
-        throttled, remaining, now = self._check_throttle()
+    def _scale_search_due(self) -> bool:
+        return (
+            self._needs_calibration()
+            and self._scale_search_stale
+            and time.monotonic() - self._last_scale_search >= CALIBRATION_SEARCH_SECONDS
+        )
 
-        if throttled:
-            print(f"Qpop throttled - skipping (wait {remaining}s).")
+    def _calibrate(
+        self, frame, match: Optional[MatchResult] = None
+    ) -> Optional[MatchResult]:
+        # With `match`, sweep scales around that detection (with room for the
+        # largest scale); without, search the whole frame. On success switch
+        # to the single best template and return the popup as it matched.
+        base = to_gray(self._to_working_format(self._reference_base))
+        started = time.perf_counter()
+        if match is None:
+            self._last_scale_search = time.monotonic()
+            self._scale_search_stale = False
+            x0 = y0 = 0
+            result = search_scale(base, frame)
         else:
-            try:
-                send_start = time.time()
-                self._send_discord_message(f"{self._mention} Your Queue has popped!")
-                send_end = time.time()
+            reach_w = int(base.shape[1] * max(COARSE_SCALES))
+            reach_h = int(base.shape[0] * max(COARSE_SCALES))
+            center_x = match.location[0] + match.size[0] // 2
+            center_y = match.location[1] + match.size[1] // 2
+            x0, y0 = max(0, center_x - reach_w), max(0, center_y - reach_h)
+            x1 = min(frame.shape[1], center_x + reach_w)
+            y1 = min(frame.shape[0], center_y + reach_h)
+            result = calibrate_scale(base, crop_frame(frame, (x0, y0, x1, y1)))
+        elapsed = time.perf_counter() - started
 
-                self._last_qpop_time = now
-                print(f"Discord notification sent. HTTP took {send_end - send_start:.3f}s")
-            except Exception as e:
-                print("Error sending webhook:", e)
+        # A whole-frame search has far more chances at a look-alike.
+        threshold = self._confidence
+        if match is None:
+            threshold = min(0.95, self._confidence + CALIBRATION_SEARCH_MARGIN)
+        if result is None or result.score < threshold:
+            if match is None:
+                logger.debug("UI scale search found no popup (%.3fs).", elapsed)
+            else:
+                logger.info(
+                    "UI scale calibration inconclusive (%.3fs); will retry.", elapsed
+                )
+            return None
 
-        # local GUI feedback timing
-        gui_start = time.time()
+        logger.info(
+            "Calibrated UI scale %.2f (score %.3f) in %.3fs.",
+            result.scale,
+            result.score,
+            elapsed,
+        )
+        self._calibrated_scale = result.scale
+        self._reference_images = self._prepare_reference_images()
+        self._reset_matching()
+
+        name, reference = self._reference_images[0]
+        found = MatchResult(
+            name=name,
+            score=result.score,
+            location=(x0 + result.location[0], y0 + result.location[1]),
+            size=frame_size(reference),
+        )
+        self._anchor = found
+        if self._settings.lock_roi:
+            self._lock = found
+
+        if match is None:
+            # Not reported or saved yet: the next frames must match it too.
+            self._calibration_pending = CALIBRATION_CONFIRM_FRAMES
+            return None
+
+        # Carry the current detection over to the new template so the popup
+        # that is on screen right now is not reported a second time.
+        self._last_match = found
+        if self._on_calibrated:
+            self._on_calibrated(result.scale, self._screen_size)
+        return self._last_match
+
+    def _confirm_calibration(self, matched: bool) -> None:
+        # Called on each evaluated frame while a searched scale is pending.
+        if matched:
+            self._calibration_pending = 0
+            logger.info("Confirmed UI scale %.2f.", self._calibrated_scale)
+            if self._on_calibrated:
+                self._on_calibrated(self._calibrated_scale, self._screen_size)
+            return
+
+        self._calibration_pending -= 1
+        if self._calibration_pending > 0:
+            return
+        logger.info(
+            "UI scale %.2f did not match again; back to the default variants.",
+            self._calibrated_scale,
+        )
+        self._calibrated_scale = 0.0
+        self._reference_images = self._prepare_reference_images()
+        self._reset_matching()
+
+    def _check_screen_size(self) -> bool:
+        # Capture side: re-read the screen size every SCREEN_CHECK_SECONDS
+        # and retarget the source on a change. Returns True on a change.
+        now = time.monotonic()
+        if now - self._last_screen_check < SCREEN_CHECK_SECONDS:
+            return False
+        self._last_screen_check = now
+
+        screen_size = tuple(pyautogui.size())
+        if screen_size == self._screen_size:
+            return False
+
+        logger.info(
+            "Screen size changed %s -> %s; recalibrating UI scale.",
+            self._screen_size,
+            screen_size,
+        )
+        self._screen_size = screen_size
+        self._region = self._compute_top_center_region()
+        self._source.set_region(self._region)
+        return True
+
+    def _on_screen_changed(self) -> None:
+        # Matching side: go back to the uncalibrated variants.
+        self._calibrated_scale = 0.0
+        self._calibration_pending = 0
+        self._last_scale_search = float("-inf")
+        self._reference_images = self._prepare_reference_images()
+        self._reset_matching()
+
+    def _handle_detected_popup(
+        self,
+        match_name: str,
+        captured_at: float,
+        matched_at: float,
+    ) -> None:
+        # `captured_at`/`matched_at` are time.monotonic() stamps of the frame
+        # that triggered the pop; the rest of the timeline is filled in here
+        # and by the notifier as each destination completes.
+        timeline = self._latency.begin(match_name, captured_at, matched_at)
+        detected_at = timeline.detected_wall
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(detected_at))
+        logger.info("[%s] Queue popup detected via '%s'", timestamp, match_name)
+
+        # LAN subscribers first: no network hop beyond the local socket write.
+        if self._push is not None:
+            self._push.publish(
+                "queue_pop", {"match": match_name, "sent_at": detected_at}
+            )
+            timeline.pushed_at = time.monotonic()
+
+        # Queued for the notifier's workers; send results are reported there.
+        self._latency.expect(timeline, self._notifier.destination_names)
+        queued, remaining = self._notifier.notify_popup(timeline.event_id)
+        if queued:
+            timeline.enqueued_at = time.monotonic()
+        else:
+            self._latency.cancel_expect(timeline)
+            logger.info("Qpop throttled - skipping (wait %ss).", remaining)
+
+        # local GUI feedback
+        callback_start = time.monotonic()
         if self._on_detect:
             self._on_detect()
-        gui_end = time.time()
-        print(f"Local GUI detect effect took {gui_end - gui_start:.3f}s")
+        timeline.callback_seconds = time.monotonic() - callback_start
+        self._latency.finish(timeline)
+
+    def _process_frame(self, screenshot, captured_at: float) -> None:
+        # Convert once; the gate and every matcher stage share it
+        frame = self._matcher.prepare_frame(screenshot)
+        if not self._patch_checked:
+            self._prepare_patch(frame)
+
+        # Check all reference images against this single frame, unless
+        # it looks the same as the last one we actually matched. A running
+        # miss countdown needs its frames even on a static screen. A burst
+        # doesn't force anything: its fast ticks just catch the next change
+        # the gate lets through sooner.
+        score: Optional[float] = None
+        force = self._search_pending() or self._calibration_pending > 0
+        if self._gate is None or self._gate.should_evaluate(frame, force=force):
+            self._last_match = self._find_queue_popup(frame)
+            score = self._matcher.last_score
+            self._scale_search_stale = True
+            if self._calibration_pending:
+                self._confirm_calibration(self._last_match is not None)
+        # Uncalibrated and nothing matched: the popup may be at a UI scale
+        # the variants can't reach, so look for it at any scale now and then.
+        if self._last_match is None and self._scale_search_due():
+            self._calibrate(frame)
+        matched_at = time.monotonic()
+        self._update_rate(score)
+        match = self._last_match
+        popup_active = match is not None
+
+        # Transition: no popup -> popup
+        if popup_active and not self._seen_once:
+            self._handle_detected_popup(match.name, captured_at, matched_at)
+            self._seen_once = True
+
+            # One-time UI scale calibration on a frame with the popup
+            if self._needs_calibration():
+                self._calibrate(frame, match)
+
+        # Transition: popup -> gone
+        elif not popup_active and self._seen_once:
+            logger.info("Popup gone, ready for next detection.")
+            self._seen_once = False
 
     def _loop(self) -> None:
         # Main watcher loop running in a background thread.
+        if self._settings.pipeline:
+            capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+            capture_thread.start()
+            self._match_loop()
+            capture_thread.join()
+        else:
+            self._sequential_loop()
+
+        self._matcher.close()
+        if not self._settings.pipeline:
+            self._source.close()
+        # A newer watcher may already share the notifier; leave its listener.
+        self._notifier.clear_result_listener(self._latency.delivered)
+        self._latency.close()
+        if self._owns_notifier:
+            self._notifier.close()
+        if self._push is not None:
+            self._push.close()
+
+        capture = self._source.stats
+        logger.info(
+            "Capture (%s): %d frames, avg %.2f ms.",
+            self._source.name,
+            capture.frames,
+            capture.average_seconds * 1000.0,
+        )
+        sched = self._scheduler.stats
+        logger.info(
+            "Scheduler: %.2f Hz achieved (idle target %.2f Hz), jitter mean %.2f ms / "
+            "max %.2f ms, %d missed deadlines, %d burst(s).",
+            sched.achieved_rate,
+            1.0 / self._check_interval,
+            sched.mean_jitter * 1000.0,
+            sched.jitter_max * 1000.0,
+            sched.missed,
+            self._bursts,
+        )
+        if self._settings.pipeline:
+            logger.info(
+                "Pipeline: %d frames published, %d dropped as stale.",
+                self._mailbox.published,
+                self._mailbox.dropped,
+            )
+        if self._gate is not None:
+            stats = self._gate.stats
+            logger.info(
+                "Change gate skipped %d of %d frames (%.1f%%).",
+                stats.skipped,
+                stats.frames,
+                stats.skip_ratio * 100.0,
+            )
+        notify = self._notifier.stats
+        if notify.sent or notify.failed:
+            logger.info(
+                "Notifications: %d sent, %d failed, %d retries (%d rate limited), "
+                "avg %.3fs enqueue-to-send.",
+                notify.sent,
+                notify.failed,
+                notify.retries,
+                notify.rate_limited,
+                notify.average_latency,
+            )
+            for name, dest in notify.destinations.items():
+                logger.info(
+                    "  %s: %d sent, %d errors, avg HTTP %.3fs.",
+                    name,
+                    dest.sent,
+                    dest.errors,
+                    dest.average_seconds,
+                )
+        if self._push is not None and self._push.stats.events:
+            push = self._push.stats
+            logger.info(
+                "LAN push: %d event(s), %d deliveries, avg %.2f ms / max %.2f ms "
+                "publish-to-flush.",
+                push.events,
+                push.deliveries,
+                push.average_write_seconds * 1000.0,
+                push.max_write_seconds * 1000.0,
+            )
+        logger.info(
+            "Reference hits: %s",
+            ", ".join(f"{t.name}={t.hits}" for t in self._matcher.templates),
+        )
+        logger.info("Watcher stopped.")
+
+    def _log_error(self, what: str, exc: Exception) -> None:
+        # Rate-limited per distinct error; the first one carries a traceback.
+        self._error_log.log(
+            logging.ERROR,
+            (what, type(exc).__name__, str(exc)),
+            "%s: %s",
+            what,
+            exc,
+            exc_info=exc,
+        )
+
+    def _sequential_loop(self) -> None:
+        # Capture and match back-to-back in this thread.
         while not self._stop_event.is_set():
             try:
-                # Take a single screenshot of the region
-                screenshot = pyautogui.screenshot(region=self._region)
+                if self._check_screen_size():
+                    self._on_screen_changed()
 
-                # Check all reference images against this single screenshot
-                match_name = self._find_queue_popup(screenshot)
-                popup_active = match_name is not None
+                # Take a single capture of the region
+                pixels = self._source.grab()
+                self._process_frame(pixels, time.monotonic())
 
-                # Transition: no popup -> popup
-                if popup_active and not self._seen_once:
-                    self._handle_detected_popup(match_name)
-                    self._seen_once = True
+                if self._scheduler.wait():
+                    break
 
-                # Transition: popup -> gone
-                elif not popup_active and self._seen_once:
-                    print("Popup gone, ready for next detection.")
-                    self._seen_once = False
+            except Exception as e:
+                self._log_error("Watcher error", e)
+                if self._stop_event.wait(2):
+                    break
+                self._scheduler.reset()
+
+    def _capture_loop(self) -> None:
+        # Pipeline stage 1: grab frames on `check_interval` deadlines and publish them;
+        # matching never holds this thread up.
+        while not self._stop_event.is_set():
+            try:
+                if self._check_screen_size():
+                    self._screen_changed.set()
 
-                if self._stop_event.wait(self._check_interval):
+                buf = self._mailbox.acquire(self._source.frame_shape)
+                pixels = self._source.grab(out=buf)
+                self._mailbox.publish(pixels, time.monotonic())
+
+                if self._scheduler.wait():
                     break
 
             except Exception as e:
-                print("Watcher error:", e)
+                self._log_error("Capture error", e)
                 if self._stop_event.wait(2):
                     break
+                self._scheduler.reset()
+
+        self._source.close()
+        self._mailbox.close()
 
-        print("Watcher stopped.")
+    def _match_loop(self) -> None:
+        # Pipeline stage 2: always match the newest frame; stale ones are
+        # dropped by the mailbox.
+        while not self._stop_event.is_set():
+            try:
+                captured = self._mailbox.take(timeout=max(self._check_interval, 0.1))
+                if captured is None:
+                    continue
 
-    def _prepare_reference_images(self) -> List[Tuple[str, Image.Image]]:
-        prepared: List[Tuple[str, Image.Image]] = []
+                if self._screen_changed.is_set():
+                    self._screen_changed.clear()
+                    self._on_screen_changed()
+
+                self._process_frame(captured.pixels, captured.captured_at)
+
+            except Exception as e:
+                self._log_error("Watcher error", e)
+                if self._stop_event.wait(2):
+                    break
+
+    def _prepare_reference_images(self) -> List[Tuple[str, np.ndarray]]:
+        # Scale variants of the user reference, in the capture working format.
+        prepared: List[Tuple[str, np.ndarray]] = []
 
         # Only use user-provided reference image
         if self._reference_path and self._reference_path.exists():
@@ -231,25 +1010,41 @@ class QPopWatcher:
                     base = img.convert("RGB")
                     base.load()
             except Exception as exc:
-                print(f"Failed to load user reference image: {exc}")
+                logger.error("Failed to load user reference image: %s", exc)
                 return prepared
+            self._reference_base = base
 
-            # Small multi-scale around 100% for robustness
-            for factor in (0.9, 1.0, 1.1):
-                if factor == 1.0:
-                    variant = base
-                else:
-                    new_w = max(1, int(round(base.width * factor)))
-                    new_h = max(1, int(round(base.height * factor)))
-                    variant = base.resize((new_w, new_h), Image.BICUBIC)
-                prepared.append((f"user_ref_{factor:.1f}", variant))
+            if self._calibrated_scale > 0:
+                # Calibrated: a single template at the user's UI scale
+                factor = self._calibrated_scale
+                new_w = max(1, int(round(base.width * factor)))
+                new_h = max(1, int(round(base.height * factor)))
+                variant = base.resize((new_w, new_h), Image.BICUBIC)
+                prepared.append(
+                    (f"user_ref_cal_{factor:.2f}", self._to_working_format(variant))
+                )
+            else:
+                # Small multi-scale around 100% for robustness
+                for factor in (0.9, 1.0, 1.1):
+                    if factor == 1.0:
+                        variant = base
+                    else:
+                        new_w = max(1, int(round(base.width * factor)))
+                        new_h = max(1, int(round(base.height * factor)))
+                        variant = base.resize((new_w, new_h), Image.BICUBIC)
+                    prepared.append(
+                        (f"user_ref_{factor:.1f}", self._to_working_format(variant))
+                    )
 
-            print(
-                f"Loaded ONLY user reference image with {len(prepared)} scale variants "
-                f"from: {self._reference_path}"
+            logger.info(
+                "Loaded ONLY user reference image with %d scale variants from: %s",
+                len(prepared),
+                self._reference_path,
             )
             return prepared
 
         # No fallback at all while testing
-        print("No valid user reference image; detection will be disabled (no fallbacks).")
+        logger.warning(
+            "No valid user reference image; detection will be disabled (no fallbacks)."
+        )
         return prepared
\ No newline at end of file
@@ -0,0 +1,19 @@
+import time
+
+import pytest
+
+# Manual scripts that need a real screen; not part of the pytest suite.
+collect_ignore = ["QpopCV_prototype.py", "test_capture_region.py"]
+
+
+@pytest.fixture
+def wait_for():
+    # Poll `condition` until it holds or `timeout` runs out; returns its
+    # final value so tests can `assert wait_for(...)`.
+    def wait(condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return condition()
+
+    return wait
@@ -0,0 +1,64 @@
+import numpy as np
+
+from qpopcv.capture import FrameMailbox, FrameSource
+
+
+class CountingSource(FrameSource):
+    # Fills each frame with the grab count instead of reading the screen.
+    name = "counting"
+
+    def _grab(self, out: np.ndarray) -> np.ndarray:
+        out.fill(self.stats.frames % 256)
+        return out
+
+
+def test_producer_never_gets_the_held_buffer():
+    mailbox = FrameMailbox()
+    shape = (4, 6)
+    first = mailbox.acquire(shape)
+    mailbox.publish(first, 0.0)
+    held = mailbox.take(timeout=0.0)
+    assert held.pixels is first
+
+    # The consumer sits on `first` while the producer races ahead.
+    for i in range(10):
+        buf = mailbox.acquire(shape)
+        assert buf is not first
+        mailbox.publish(buf, float(i))
+    assert mailbox.dropped == 9
+    assert mailbox.take(timeout=0.0).seq == 11
+
+
+def test_mailbox_cycles_three_buffers():
+    mailbox = FrameMailbox()
+    shape = (4, 6)
+    seen = []
+    for i in range(20):
+        buf = mailbox.acquire(shape)
+        seen.append(buf)
+        mailbox.publish(buf, float(i))
+        if i % 2:
+            mailbox.take(timeout=0.0)
+
+    assert len({id(buf) for buf in seen}) <= 3
+
+
+def test_take_returns_none_on_timeout_and_close():
+    mailbox = FrameMailbox()
+    assert mailbox.take(timeout=0.01) is None
+    mailbox.close()
+    assert mailbox.take(timeout=5.0) is None
+
+
+def test_ring_is_allocated_on_first_own_grab():
+    source = CountingSource((0, 0, 6, 4), ring_size=3)
+    out = np.empty(source.frame_shape, dtype=np.uint8)
+    assert source.grab(out) is out
+    assert source._ring == []
+
+    frames = [source.grab() for _ in range(4)]
+    assert frames[0] is frames[3]
+    assert len({id(frame) for frame in frames[:3]}) == 3
+
+    source.set_region((0, 0, 8, 8))
+    assert source.grab().shape == (8, 8)
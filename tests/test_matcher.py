@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+
+from qpopcv.matcher import MATCH_METHOD, FFTMatcher, TemplateMatcher, TiledMatcher
+
+
+def _scene():
+    rng = np.random.default_rng(0)
+    background = rng.integers(90, 110, (240, 320)).astype(np.float32)
+    template = rng.integers(0, 2, (12, 16)).repeat(4, 0).repeat(4, 1) * 60.0 + 70.0
+    return background, template.astype(np.uint8)
+
+
+def test_tiled_detects_slow_fade_in():
+    # Each step moves popup pixels by less than `tile_threshold`; the
+    # changes have to add up in the tiled reference frame.
+    background, template = _scene()
+    direct = TemplateMatcher([("popup", template)], confidence=0.8)
+    tiled = TiledMatcher([("popup", template)], confidence=0.8, pixel_threshold=8.0)
+
+    found = {}
+    for step in range(21):
+        alpha = step / 20.0
+        frame = background.copy()
+        region = frame[100:148, 150:214]
+        region += alpha * (template - region)
+        frame = frame.astype(np.uint8)
+
+        for name, matcher in (("direct", direct), ("tiled", tiled)):
+            result = matcher.match(frame)
+            if result is not None and name not in found:
+                found[name] = step
+                assert result.location == (150, 100)
+
+    assert "direct" in found
+    assert "tiled" in found
+    assert found["tiled"] <= found["direct"] + 2
+
+
+def test_fft_scores_match_direct_mode():
+    # FFT mode promises the same TM_CCOEFF_NORMED map as cv2.matchTemplate.
+    rng = np.random.default_rng(1)
+    frame = rng.integers(0, 256, (120, 160)).astype(np.uint8)
+    templates = [
+        ("exact", np.ascontiguousarray(frame[30:70, 50:110])),
+        ("noise", rng.integers(0, 256, (25, 33)).astype(np.uint8)),
+    ]
+    # Above any possible score, so every template gets scored.
+    matcher = FFTMatcher(templates, confidence=1.5)
+
+    assert matcher.match(frame) is None
+    for name, template in templates:
+        expected = cv2.matchTemplate(frame, template, MATCH_METHOD)
+        actual = matcher._result_buffers[("fft", name)]
+        assert actual.shape == expected.shape
+        assert np.abs(actual - expected).max() < 1e-3
+
+    matcher = FFTMatcher(templates, confidence=0.9)
+    result = matcher.match(frame)
+    assert result is not None
+    assert (result.name, result.location) == ("exact", (50, 30))
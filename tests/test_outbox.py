@@ -0,0 +1,129 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from qpopcv import outbox as outbox_module
+from qpopcv.discord_client import WebhookClient, encode_payload
+from qpopcv.notifier import Destination, NotificationDispatcher
+from qpopcv.outbox import NotificationOutbox
+
+
+class StandIn:
+    """
+    Local webhook stand-in.
+    - Answers POSTs from `script` (status, headers) in order, then 204.
+    - Records every POST body in `posts`.
+    """
+
+    def __init__(self) -> None:
+        self.script = []
+        self.posts = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stand_in.posts.append(body)
+                status, headers = stand_in.script.pop(0) if stand_in.script else (204, {})
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/webhooks/1/x"
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(outbox_module, "RETRY_BASE_SECONDS", 0.05)
+
+
+def send(url, payload, timeout):
+    return WebhookClient(url).post(payload, timeout=timeout)
+
+
+def test_retries_server_error_and_rate_limit(tmp_path, stand_in, wait_for):
+    stand_in.script[:] = [(500, {}), (429, {"Retry-After": "0.1"})]
+    outbox = NotificationOutbox(tmp_path / "outbox.json")
+    dispatcher = NotificationDispatcher(send, outbox)
+    dispatcher.start()
+    try:
+        dispatcher.submit([(Destination("main", stand_in.url), encode_payload("pop"))])
+        assert wait_for(lambda: dispatcher.stats.sent == 1)
+    finally:
+        dispatcher.close()
+
+    assert len(stand_in.posts) == 3
+    assert dispatcher.stats.retries == 2
+    assert dispatcher.stats.rate_limited == 1
+    assert len(outbox) == 0
+    assert NotificationOutbox(tmp_path / "outbox.json").due() == []
+
+
+def test_pending_entry_survives_restart(tmp_path, stand_in, monkeypatch, wait_for):
+    path = tmp_path / "outbox.json"
+    # Long enough that the first run closes before the retry is due.
+    monkeypatch.setattr(outbox_module, "RETRY_BASE_SECONDS", 0.5)
+    stand_in.script[:] = [(503, {})]
+    outbox = NotificationOutbox(path)
+    dispatcher = NotificationDispatcher(send, outbox)
+    dispatcher.start()
+    dispatcher.submit([(Destination("main", stand_in.url), encode_payload("pop"))])
+    assert wait_for(lambda: dispatcher.stats.retries == 1)
+    dispatcher.close()
+    assert len(outbox) == 1
+
+    restarted = NotificationOutbox(path)
+    assert len(restarted) == 1
+    dispatcher = NotificationDispatcher(send, restarted)
+    dispatcher.start()
+    try:
+        assert wait_for(lambda: dispatcher.stats.sent == 1)
+    finally:
+        dispatcher.close()
+
+    assert stand_in.posts == [encode_payload("pop")] * 2
+    assert len(NotificationOutbox(path)) == 0
+
+
+def test_submit_writes_outbox_once(tmp_path, monkeypatch):
+    outbox = NotificationOutbox(tmp_path / "outbox.json")
+    saves = []
+    original = NotificationOutbox._save
+    monkeypatch.setattr(
+        NotificationOutbox, "_save", lambda self: (saves.append(1), original(self))
+    )
+    dispatcher = NotificationDispatcher(send, outbox)
+    messages = [
+        (Destination(f"dest-{i}", f"http://127.0.0.1:9/{i}"), encode_payload("pop"))
+        for i in range(3)
+    ]
+
+    dispatcher.submit(messages, event_id="event")
+
+    assert len(saves) == 1
+    assert [e.name for e in NotificationOutbox(tmp_path / "outbox.json").due()] == [
+        "dest-0",
+        "dest-1",
+        "dest-2",
+    ]
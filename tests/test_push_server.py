@@ -0,0 +1,90 @@
+import http.client
+import json
+import time
+
+import pytest
+
+from qpopcv.push_server import PushServer
+
+
+@pytest.fixture
+def server():
+    push = PushServer("127.0.0.1", 0)
+    push.start()
+    yield push
+    push.close()
+
+
+def subscribe(push, wait_for):
+    host, port = push.address
+    conn = http.client.HTTPConnection(host, port, timeout=5)
+    conn.request("GET", "/events")
+    response = conn.getresponse()
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "text/event-stream"
+    assert wait_for(lambda: push.subscribers > 0)
+    return conn, response
+
+
+def read_event(response):
+    # Lines of one SSE message, up to the blank line that ends it.
+    fields = {}
+    while True:
+        line = response.readline().decode("utf-8").rstrip("\n")
+        if not line:
+            if fields:
+                return fields
+            continue
+        key, _, value = line.partition(": ")
+        fields[key] = value
+
+
+def test_subscriber_receives_event_quickly(server, wait_for, record_property):
+    conn, response = subscribe(server, wait_for)
+    try:
+        assert "retry" in read_event(response)
+
+        published_at = time.perf_counter()
+        assert server.publish("queue_pop", {"match": "user_ref_1.0"}) == 1
+        event = read_event(response)
+        elapsed = time.perf_counter() - published_at
+    finally:
+        conn.close()
+
+    assert event["event"] == "queue_pop"
+    assert json.loads(event["data"]) == {"match": "user_ref_1.0"}
+    # Counted by the server after its flush, which may trail the client read.
+    assert wait_for(lambda: server.stats.deliveries == 1)
+    write_seconds = server.stats.max_write_seconds
+    record_property("publish_to_flush_ms", round(write_seconds * 1000.0, 3))
+    record_property("publish_to_read_ms", round(elapsed * 1000.0, 3))
+    # Loose bound: a local write should never take anywhere near a second,
+    # even on a loaded CI machine.
+    assert write_seconds < 1.0, f"publish -> flush took {write_seconds:.3f}s"
+
+
+def test_every_subscriber_gets_the_event(server, wait_for):
+    clients = [subscribe(server, wait_for) for _ in range(3)]
+    try:
+        assert wait_for(lambda: server.subscribers == 3)
+        assert server.publish("queue_pop", {"n": 1}) == 3
+        for _, response in clients:
+            read_event(response)  # retry hint
+            assert json.loads(read_event(response)["data"]) == {"n": 1}
+    finally:
+        for conn, _ in clients:
+            conn.close()
+
+
+def test_page_is_served(server):
+    host, port = server.address
+    conn = http.client.HTTPConnection(host, port, timeout=5)
+    try:
+        conn.request("GET", "/")
+        response = conn.getresponse()
+        body = response.read().decode("utf-8")
+    finally:
+        conn.close()
+
+    assert response.status == 200
+    assert 'new EventSource("/events")' in body
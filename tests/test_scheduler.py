@@ -0,0 +1,42 @@
+import threading
+import time
+
+from qpopcv.scheduler import DeadlineScheduler
+
+
+def test_overrun_counts_missed_ticks_and_stays_on_grid():
+    scheduler = DeadlineScheduler(0.1, threading.Event())
+    assert scheduler.wait() is False  # tick at start + 0.1
+    # Work overruns the deadlines at +0.2, +0.3 and +0.4.
+    time.sleep(0.35)
+    assert scheduler.wait() is False
+
+    stats = scheduler.stats
+    assert stats.ticks == 2
+    assert stats.missed == 3
+    # Resumed on the next grid point, not 0.1 s after the late wake-up.
+    assert abs(stats.last_tick_at - stats.started_at - 0.5) < 0.04
+
+
+def test_on_time_ticks_miss_nothing():
+    scheduler = DeadlineScheduler(0.05, threading.Event())
+    for _ in range(5):
+        assert scheduler.wait() is False
+    assert scheduler.stats.ticks == 5
+    assert scheduler.stats.missed == 0
+
+
+def test_stop_cuts_a_long_wait_short():
+    stop_event = threading.Event()
+    scheduler = DeadlineScheduler(30.0, stop_event)
+
+    def stop_soon():
+        time.sleep(0.05)
+        stop_event.set()
+        scheduler.wake()
+
+    threading.Thread(target=stop_soon, daemon=True).start()
+    started = time.monotonic()
+    assert scheduler.wait() is True
+    assert time.monotonic() - started < 5.0
+    assert scheduler.stats.ticks == 0